@@ -19,7 +19,7 @@ class BlogLoader {
             const posts = await Promise.all(
                 blogFiles.map(async (filename) => {
                     try {
-                        const response = await fetch(`/blog/${filename}`);
+                        const response = await fetch(`${this.blogBase()}${filename}`);
                         if (!response.ok) throw new Error(`Failed to load ${filename}`);
                         
                         const content = await response.text();
@@ -42,6 +42,13 @@ class BlogLoader {
         }
     }
 
+    blogBase() {
+        // Translated copies of the site live under /<lang>/ with their own blog/ folder
+        const lang = (document.documentElement.lang || '').toLowerCase();
+        const prefix = lang && window.location.pathname.startsWith(`/${lang}/`) ? `/${lang}` : '';
+        return `${prefix}/blog/`;
+    }
+
     async discoverBlogFiles() {
         // List of actual blog files in the blog directory
         const blogFiles = [
@@ -54,7 +61,7 @@ class BlogLoader {
         // Verify which files actually exist
         const existingFiles = [];
         for (const filename of blogFiles) {
-            if (await this.fileExists(`/blog/${filename}`)) {
+            if (await this.fileExists(`${this.blogBase()}${filename}`)) {
                 existingFiles.push(filename);
             }
         }
@@ -134,6 +141,7 @@ class BlogLoader {
     }
 
     getFallbackPosts() {
+        // i18n:start (fallback strings translated by python/translate_site.py)
         return [
             {
                 title: 'The AI Revolution in Industrial Applications',
@@ -163,6 +171,7 @@ class BlogLoader {
                 readTime: '8 min read'
             }
         ];
+        // i18n:end
     }
 
     renderBlogPosts(containerId, limit = 3) {
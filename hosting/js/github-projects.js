@@ -36,6 +36,7 @@ class GitHubProjectsLoader {
 
     getFallbackProjects() {
         // Fallback data in case GitHub API is unavailable
+        // i18n:start (fallback strings translated by python/translate_site.py)
         return [
             {
                 name: 'InfiniLead',
@@ -60,6 +61,7 @@ class GitHubProjectsLoader {
                 size: 2048
             }
         ];
+        // i18n:end
     }
 
     getLanguageColor(language) {
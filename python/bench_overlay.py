@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""Benchmark the language-switcher overlay refresh: in-place fast path vs full BeautifulSoup parse.
+
+Example::
+
+    python bench_overlay.py ../hosting --repeat 20
+
+Both paths run on every HTML page under the site root (nothing is written back).
+The script also reports pages where the two outputs differ.
+"""
+from __future__ import annotations
+
+import argparse
+import pathlib
+import time
+from typing import Sequence
+
+from translate_site import LanguageEntry, ensure_overlay
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Compare fast-path and full-parse overlay injection.")
+    parser.add_argument("site_root", help="Root directory of the static site (e.g. ../hosting)")
+    parser.add_argument("--repeat", type=int, default=10, help="Iterations per page and path (default: 10)")
+    args = parser.parse_args(argv)
+
+    pages = sorted(pathlib.Path(args.site_root).rglob("*.html"))
+    if not pages:
+        raise SystemExit(f"No HTML files under {args.site_root}")
+    entries = [
+        LanguageEntry(code="en", label="EN", href="index.html", active=True),
+        LanguageEntry(code="de", label="DE", href="de/index.html", active=False),
+        LanguageEntry(code="fr", label="FR", href="fr/index.html", active=False),
+    ]
+
+    totals = {True: 0.0, False: 0.0}
+    mismatches = []
+    for page in pages:
+        html = page.read_text(encoding="utf-8")
+        outputs = {}
+        for fast in (True, False):
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                outputs[fast] = ensure_overlay(html=html, entries=entries, replace_existing=True, fast=fast)
+            totals[fast] += time.perf_counter() - start
+        if outputs[True] != outputs[False]:
+            mismatches.append(page)
+
+    per_page = len(pages) * args.repeat
+    print(f"{len(pages)} page(s) x {args.repeat} repeat(s)")
+    print(f"fast path:  {totals[True] / per_page * 1000:8.3f} ms/page")
+    print(f"full parse: {totals[False] / per_page * 1000:8.3f} ms/page")
+    print(f"speed-up:   {totals[False] / max(totals[True], 1e-9):8.1f}x")
+    for page in mismatches:
+        print(f"[differs] {page} (full parse also re-serializes the rest of the document)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
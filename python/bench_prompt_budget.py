@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""Measure the grading-prompt compaction of utils_prompt: tokens saved and score agreement.
+
+Example::
+
+    python bench_prompt_budget.py data/profiles.json
+    python bench_prompt_budget.py data/profiles.json --grade 100 --cache
+
+`profiles` is an Apify instagram-profile-scraper dataset export (JSON list or
+JSONL). Token counts are offline; `--grade N` additionally grades the first N
+profiles with the raw and the compacted prompt (temperature 0) and reports how
+often the two scores agree, so budgets can be checked on a held-out set before
+changing them.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import pathlib
+from typing import Sequence
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")   # enriching_leads reads both at import time
+os.environ.setdefault("APIFY_API_TOKEN", "benchmark")
+
+from enriching_leads import _CFG_DEFAULTS, _grade_messages, build_prompts, extract_score  # noqa: E402
+from utils.utils_llm import gpt_chat  # noqa: E402
+from utils.utils_prompt import CHARS_PER_TOKEN, TOKEN_BUDGETS, count_tokens, tiktoken  # noqa: E402
+
+
+def load_profiles(path: pathlib.Path) -> list[dict]:
+    text = path.read_text(encoding="utf-8")
+    if text.lstrip().startswith("["):
+        return json.loads(text)
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+def prompt_tokens(messages: list[dict], model: str) -> int:
+    return sum(count_tokens(m["content"], model) for m in messages)
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Compare raw and budgeted grading prompts.")
+    parser.add_argument("profiles", help="Apify profile dataset (JSON list or JSONL)")
+    parser.add_argument("--model", default="gpt-4o")
+    parser.add_argument("--grade", type=int, default=0, metavar="N",
+                        help="Grade the first N profiles with both prompts and report score agreement")
+    parser.add_argument("--cache", action="store_true", help="Use the LLM response cache for --grade")
+    args = parser.parse_args(argv)
+
+    profiles = load_profiles(pathlib.Path(args.profiles))
+    if not profiles:
+        raise SystemExit(f"No profiles in {args.profiles}")
+    prompts = build_prompts(_CFG_DEFAULTS["TARGET_AUDIENCE_DESCRIPTION"], _CFG_DEFAULTS["TARGET_AUDIENCE_EXAMPLES"])
+
+    raw_total = compact_total = 0
+    pairs = []
+    for prof in profiles:
+        raw = _grade_messages(prof, prompts, None)[1]
+        compact = _grade_messages(prof, prompts, TOKEN_BUDGETS)[1]
+        raw_total += prompt_tokens(raw, args.model)
+        compact_total += prompt_tokens(compact, args.model)
+        pairs.append((raw, compact))
+
+    counter = "tiktoken" if tiktoken is not None else f"~{CHARS_PER_TOKEN} chars/token estimate"
+    print(f"{len(profiles):,} profile(s), tokens counted with {counter}")
+    print(f"raw prompt:      {raw_total / len(profiles):8.1f} tokens/profile")
+    print(f"budgeted prompt: {compact_total / len(profiles):8.1f} tokens/profile")
+    print(f"saved:           {1 - compact_total / max(raw_total, 1):8.1%}")
+
+    if args.grade:
+        graded = [
+            (extract_score(gpt_chat(raw, model=args.model, temperature=0.0, cache=args.cache)),
+             extract_score(gpt_chat(compact, model=args.model, temperature=0.0, cache=args.cache)))
+            for raw, compact in pairs[:args.grade]
+        ]
+        scored = [(a, b) for a, b in graded if a is not None and b is not None]
+        if scored:
+            exact = sum(a == b for a, b in scored) / len(scored)
+            within_one = sum(abs(a - b) <= 1 for a, b in scored) / len(scored)
+            mean_shift = sum(b - a for a, b in scored) / len(scored)
+            print(f"graded {len(scored)} of {len(graded)}: exact agreement {exact:.1%}, "
+                  f"within ±1 {within_one:.1%}, mean shift {mean_shift:+.2f}")
+        else:
+            print("no profile got a score from both prompts")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -3,20 +3,28 @@
 Offline clone of your Make.com scenario, now writing to a CSV via pandas.
 
 Flow:
-1. GPT-4o spits out 40 Instagram-search queries.
-2. For each query → Apify Google-Search actor → scrape results.
+1. GPT-4o spits out 100 Instagram-search queries (steered away from recently
+   scraped ones); near-duplicates and terms scraped within QUERY_CACHE_DAYS are
+   dropped or served from the query cache.
+2. The remaining queries → Apify Google-Search actor, QUERIES_PER_RUN per run,
+   MAX_RUNS_IN_FLIGHT runs in parallel.
 3. Extract handle & follower count, keep 100 < followers < 5 000.
-4. Dump the deduped leads to leads-<timestamp>.csv in the current dir.
+4. Dump the deduped leads to leads-<timestamp>.csv in the current dir and
+   upsert them into the shared lead store (LEAD_STORE_PATH), so score_leads
+   only enriches handles that are new or stale.
 """
 
 import os, re, time, json, itertools
 from datetime import datetime, timezone
 
+import numpy as np
 import pandas as pd
 import openai
 from apify_client import ApifyClient
 from dotenv import load_dotenv
 
+from utils.utils_leadstore import LeadStore, QueryCache, LEAD_STORE_PATH
+
 # ─── Load env vars ────────────────────────────────────────────
 load_dotenv(override=True)
 
@@ -28,14 +36,20 @@ apify          = ApifyClient(APIFY_API_TOKEN)
 
 # ─── Constants ───────────────────────────────────────────────
 SYSTEM_PROMPT_TEMPLATE = """Your task is to create a list of lists of possible search terms to search on instagram for finding profiles of interest. For context, the terms you generate will be searched via google in a \n\nsite:instagram.com [your terms here]\n\ntype of manner. You can generate single search terms of multiple ones per run. You should generate *exactly* {n} different searches. Do not include the instagram filter but only the search terms. make the searches as diverse as possible but you do not need to make it too complex. One or two terms can be enough. Output the result in json format as a list of strings called search_list"""
+AVOID_TERMS_TEMPLATE = """\n\nThese searches were already run recently, do not repeat them or trivial variations of them:\n{terms}"""
+QUERY_CACHE_DAYS = float(os.environ.get("QUERY_CACHE_DAYS", 30))   # near-duplicates of terms scraped this recently are skipped
+N_AVOID_TERMS = 50
 CONTEXT_EXAMPLE = """We want to find profiles that have something to do with real estate and investment in the area of styria - Austria."""
 
 # ─── 1. Generate 40 search queries with GPT-4o ───────────────
-def generate_queries(context: str, n: int = 100) -> list[str]:
+def generate_queries(context: str, n: int = 100, avoid: list[str] | None = None) -> list[str]:
     """
     Generates a list of search queries using GPT-4o.
+    `avoid` lists recently scraped terms the model should not repeat.
     """
     system_prompt = SYSTEM_PROMPT_TEMPLATE.format(n=n)
+    if avoid:
+        system_prompt += AVOID_TERMS_TEMPLATE.format(terms="\n".join(f"- {t}" for t in avoid))
 
     try:
         resp = openai.chat.completions.create(
@@ -55,82 +69,235 @@ def generate_queries(context: str, n: int = 100) -> list[str]:
 
 # ─── 2. Scrape Google results with Apify ─────────────────────
 ACTOR_ID = "apify/google-search-scraper"
+MAX_RUNS_IN_FLIGHT = int(os.environ.get("APIFY_MAX_RUNS", 8))   # concurrent actor runs (account memory permitting)
+QUERIES_PER_RUN = int(os.environ.get("APIFY_QUERIES_PER_RUN", 25))   # terms packed into one run (1 = a run per term)
+RUN_POLL_SECS = 5
+TERMINAL_STATUSES = {"SUCCEEDED", "FAILED", "ABORTED", "TIMED-OUT"}
 
-def google_scrape(term: str) -> list[dict]:
+def google_query(term: str) -> str:
     """
-    Scrapes Google search results using the Apify Google-Search actor.
+    Full Google query for one search term.
     """
-    query = (
+    return (
         f'site:instagram.com {term} inurl:"/" '
         '-inurl:"/"*2 -inurl:/p/ -inurl:/reel/ -inurl:/tv/ '
         '-inurl:/stories/ -inurl:/explore/'
     )
 
-    run_input = {
-        "queries"        : query,
+def google_run_input(terms: str | list[str]) -> dict:
+    """
+    Actor input for one or more search terms (the actor takes newline-separated queries).
+    """
+    if isinstance(terms, str):
+        terms = [terms]
+
+    return {
+        "queries"        : "\n".join(google_query(t) for t in terms),
         "countryCode"    : "at",
         "resultsPerPage" : 100,
         "maxPagesPerQuery": 10,
         "saveHtml"       : False,
     }
 
+def split_by_query(terms: list[str], items: list[dict]) -> dict[str | None, list[dict]]:
+    """
+    Demultiplexes a multi-query run: every result page carries the query it
+    answers in `searchQuery.term`, which is mapped back to the source term.
+    Pages that match no term (e.g. the actor normalised the query differently)
+    are kept under the key None.
+    """
+    by_query = {" ".join(google_query(t).split()): t for t in terms}
+    grouped: dict[str | None, list[dict]] = {t: [] for t in terms}
+    unmatched: list[dict] = []
+    for it in items:
+        query = " ".join(((it.get("searchQuery") or {}).get("term") or "").split())
+        term = by_query.get(query) or (terms[0] if len(terms) == 1 else None)
+        if term is None:
+            unmatched.append(it)
+            continue
+        grouped[term].append(it)
+    if unmatched:
+        print(f"⚠️  {len(unmatched)} result page(s) could not be matched to a search term")
+        grouped[None] = unmatched
+    return grouped
+
+def google_scrape(term: str) -> list[dict]:
+    """
+    Scrapes Google search results using the Apify Google-Search actor.
+    """
     try:
-        run = apify.actor(ACTOR_ID).call(run_input=run_input)  # waits for the actor to complete
+        run = apify.actor(ACTOR_ID).call(run_input=google_run_input(term))  # waits for the actor to complete
         return list(apify.dataset(run["defaultDatasetId"]).iterate_items())
     except Exception as e:
         print(f"❌ Error scraping term '{term}': {e}")
         return []
 
+def google_scrape_many(terms, max_in_flight: int = MAX_RUNS_IN_FLIGHT, queries_per_run: int = QUERIES_PER_RUN,
+                       poll_secs: float = RUN_POLL_SECS):
+    """
+    Concurrent, batched `google_scrape`: packs `queries_per_run` terms into each
+    actor run, keeps up to `max_in_flight` runs going (start without waiting,
+    then poll) and yields (term, items) as each run finishes, so results can be
+    processed while the other runs are still busy. `items` is None when the
+    term's run failed (or its pages could not be told apart) and [] when Google
+    legitimately had no results, so callers can cache the latter. Pages of a
+    run that match none of its terms are yielded as (None, items): their leads
+    count, but they belong to no term to cache.
+    """
+    terms = list(terms)
+    pending = iter([terms[i:i + max(1, queries_per_run)] for i in range(0, len(terms), max(1, queries_per_run))])
+    in_flight: dict[str, list[str]] = {}   # run id -> terms
+
+    def _fill():
+        """Start runs up to `max_in_flight`; yields (term, None) for runs that failed to start."""
+        while len(in_flight) < max_in_flight:
+            batch_terms = next(pending, None)
+            if batch_terms is None:
+                return
+            try:
+                run = apify.actor(ACTOR_ID).start(run_input=google_run_input(batch_terms))
+                in_flight[run["id"]] = batch_terms
+            except Exception as e:
+                print(f"❌ Error starting run for {batch_terms}: {e}")
+                yield from ((term, None) for term in batch_terms)
+
+    yield from _fill()
+    while in_flight:
+        finished = []
+        for run_id, batch_terms in list(in_flight.items()):
+            try:
+                run = apify.run(run_id).get()
+            except Exception as e:   # transient API hiccup, ask again next round
+                print(f"⚠️  Could not poll run {run_id}: {e}")
+                continue
+            if run and run["status"] in TERMINAL_STATUSES:
+                finished.append((batch_terms, run))
+                del in_flight[run_id]
+
+        yield from _fill()   # top up before handing results out
+        for batch_terms, run in finished:
+            items = None
+            if run["status"] != "SUCCEEDED":
+                print(f"❌ Error scraping {len(batch_terms)} term(s): run {run['status']}")
+            else:
+                try:
+                    items = list(apify.dataset(run["defaultDatasetId"]).iterate_items())
+                except Exception as e:
+                    print(f"❌ Error fetching results for {len(batch_terms)} term(s): {e}")
+            if items is None:
+                yield from ((term, None) for term in batch_terms)
+                continue
+            grouped = split_by_query(batch_terms, items)
+            # with unmatched pages an empty term may just be one we failed to recognise
+            ambiguous = None in grouped
+            yield from ((term, None if ambiguous and term is not None and not its else its)
+                        for term, its in grouped.items())
+        if not finished:
+            time.sleep(poll_secs)
+
 # ─── 3. Extract & filter leads ───────────────────────────────
-RE_NUM = re.compile(r"\D+")
+MIN_FOLLOWERS, MAX_FOLLOWERS = 100, 5000   # exclusive bounds
+RE_FOLLOWERS = re.compile(r"(?P<num>\d[\d.,\s]*)\s*(?:(?P<unit>[KMB])\b)?")
+RE_SEPARATORS = re.compile(r"[,.\s]")
+UNITS = {"K": 1e3, "M": 1e6, "B": 1e9}
 
-def to_int(txt: str | None) -> int | None:
+def follower_count(value) -> int | None:
     """
-    Converts a string to an integer, removing non-numeric characters.
+    One follower count: numbers pass through (2500.0 → 2500), "3,400" / "3.400" → 3400,
+    "1.2K" / "1,2K" → 1200, "2M followers" → 2000000; anything unparseable → None.
     """
-    if not txt: return None
-    try:        return int(RE_NUM.sub("", txt))
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        return None if np.isnan(value) else int(round(value))
+    text = str(value).strip().upper()
+    digits = RE_SEPARATORS.sub("", text)
+    if digits.isascii() and digits.isdigit():   # the bulk: plain counts with thousands separators
+        return int(digits)
+    m = RE_FOLLOWERS.search(text)
+    if not m:
+        return None
+    num = re.sub(r"\s", "", m["num"])
+    try:
+        if m["unit"]:
+            return int(round(float(num.replace(",", ".")) * UNITS[m["unit"]]))
+        return int(re.sub(r"[.,]", "", num))
     except ValueError:
         return None
 
-def extract_leads(items: list[dict]) -> list[tuple[str, int]]:
+def parse_followers(values: pd.Series) -> pd.Series:
+    """
+    `follower_count` over a column as nullable Int64. Follower strings repeat a lot,
+    so the column is factorized and each distinct value is parsed only once.
+    """
+    codes, uniques = pd.factorize(values.astype(object), use_na_sentinel=True)
+    parsed = pd.array([follower_count(v) for v in uniques] + [None], dtype="Int64")
+    return pd.Series(parsed.take(codes), index=values.index)   # code -1 (missing) → the trailing None
+
+def to_int(txt: str | None) -> int | None:
+    """
+    Converts a follower string (or number) to an integer.
+    """
+    return follower_count(txt) if txt not in ("", None) else None
+
+def leads_frame(items: list[dict]) -> pd.DataFrame:
+    """
+    Flattens all `organicResults` of the scraped pages and applies the follower
+    filter and `channelName` dedup in bulk on two columns; only the surviving
+    results are materialized into the returned DataFrame.
+    Pages without results and results without a parsable follower count are skipped.
+    """
+    rows = [r for it in items for r in (it.get("organicResults") or [])]
+    followers = parse_followers(pd.Series([r.get("followersAmount") for r in rows], dtype=object))
+    names = pd.Series([r.get("channelName") for r in rows], dtype=object)
+    keep = ((followers > MIN_FOLLOWERS) & (followers < MAX_FOLLOWERS)).fillna(False).to_numpy(dtype=bool)
+    keep &= ~(names.where(keep).duplicated() & keep & names.notna()).to_numpy(dtype=bool)
+    if not keep.any():
+        return pd.DataFrame(columns=["channelName", "followersAmount"])
+    df = pd.DataFrame.from_records([r for r, k in zip(rows, keep) if k])
+    df["followersAmount"] = followers[keep].to_numpy()
+    return df
+
+def extract_leads(items: list[dict]) -> list[dict]:
     """
     Extracts and filters leads from the scraped data.
-    Keeps only leads with follower counts between 100 and 5000.
+    Keeps only leads with follower counts between 100 and 5000 (input dicts are not modified).
     """
-    extracted_leads = []
-    for it in items:
-        leads = it.get("organicResults")
-        for lead in leads:
-            if "followersAmount" not in lead:
-                continue
-            followers_string = lead["followersAmount"]
-            followers_int = int(re.sub(r"[^\d]", "", followers_string))
-            lead["followersAmount"] = followers_int
-            if followers_int < 5000 and followers_int > 100:
-                extracted_leads.append(lead)
-    return extracted_leads
+    return leads_frame(items).to_dict("records")
 
 # ─── 4. Main glue code ───────────────────────────────────────
-def main():
+def main(max_in_flight: int = MAX_RUNS_IN_FLIGHT, queries_per_run: int = QUERIES_PER_RUN,
+         lead_store: str | None = LEAD_STORE_PATH):
     """
     Main function to generate queries, scrape data, extract leads, and save to CSV.
     """
     context = CONTEXT_EXAMPLE
 
-    # Generate search queries
-    queries = generate_queries(context)
-    print(f"🔍  {len(queries)} search terms ready")
+    # Generate search queries, steering away from (and then dropping) recently scraped ones
+    qcache = QueryCache(lead_store) if lead_store else None
+    recent = [term for term, _, _ in qcache.recent(QUERY_CACHE_DAYS)][:N_AVOID_TERMS] if qcache else []
+    queries = generate_queries(context, avoid=recent)
 
-    all_leads: list[dict] = []
-    for q in queries:
-        print(f"   • scraping “{q}”…")
-        items  = google_scrape(q)  # Scrape results for each query
-        all_leads.extend(extract_leads(items))  # Extract and filter leads
-        time.sleep(1)   # Play nice with APIs
+    frames: list[pd.DataFrame] = []
+    if qcache:
+        generated = len(queries)
+        queries, cached = qcache.partition(queries, max_age_days=QUERY_CACHE_DAYS)
+        frames.extend(pd.DataFrame(leads) for _, leads in cached.values())
+        print(f"♻️  {len(cached)} term(s) served from the query cache, "
+              f"{generated - len(queries) - len(cached)} near-duplicate(s) dropped")
+    n_runs = -(-len(queries) // max(1, queries_per_run))
+    print(f"🔍  {len(queries)} search terms ready, {n_runs} actor run(s), {max_in_flight} at a time")
+
+    for q, items in google_scrape_many(queries, max_in_flight=max_in_flight, queries_per_run=queries_per_run):
+        leads = leads_frame(items or [])  # Extract and filter leads as each run finishes
+        # failed runs are retried next time; empty successes are cached; unmatched pages (q None) are not
+        if qcache and q is not None and items is not None:
+            qcache.record(q, leads.to_dict("records"))
+        print(f"   • “{q}”: {len(leads)} leads" if q is not None else f"   • unmatched pages: {len(leads)} leads")
+        frames.append(leads)
 
     # Save leads to CSV
-    df = pd.DataFrame(all_leads)
+    df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=["channelName"])
     print(f"🔍  {len(df)} leads found")
     df = df.drop_duplicates(subset="channelName", keep="first")
     print(f"🔍  {len(df)} deduped leads")
@@ -139,5 +306,13 @@ def main():
 
     print(f"✅  {len(df)} leads saved to {fname}")
 
+    if lead_store and not df.empty:
+        store = LeadStore(lead_store)
+        n_new = store.upsert_discovered(df.to_dict("records"))
+        print(f"🗃️  {n_new} new / {len(df) - n_new} known leads in {lead_store} ({store.stats()['leads']} total)")
+        store.close()
+    if qcache:
+        qcache.close()
+
 if __name__ == "__main__":
     main()
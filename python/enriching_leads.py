@@ -14,17 +14,20 @@ Can be run as a CLI  *or*  imported as a library:
 ...     csv_in="raw_handles.csv",
 ... )
 >>> print(df.head())
+
+Inside async code use the engine directly: `df = await ascore_leads(...)`.
 """
 
 from __future__ import annotations
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor
 ###############################################################################
 #                               STANDARD IMPORTS                              #
 ###############################################################################
-import os, re, sys, time, json, textwrap, logging
+import os, re, sys, time, json, hashlib, textwrap, logging, asyncio, itertools
 from pathlib import Path
+from collections import Counter
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Callable, Coroutine, Dict, Iterable, Iterator, List, Optional, Tuple
 
 import pandas as pd
 import requests
@@ -35,7 +38,15 @@ from tenacity import retry, stop_after_attempt, wait_fixed, retry_if_exception_t
 import yaml
 from tqdm import tqdm  # added import for tqdm
 
-from utils.utils_llm import gpt_chat, query_perplexity
+from utils.utils_llm import agpt_chat, aquery_perplexity, aclose_clients, batch_chat, LLM_MAX_CONCURRENCY
+from utils.utils_cache import get_default_cache
+from utils.utils_dedup import SeenSet
+from utils.utils_leadstore import LeadStore, LEAD_STORE_PATH
+from utils.utils_metrics import LLMMetrics, llm_labels
+from utils.utils_prompt import (
+    PROMPT_CACHE_MIN_TOKENS, TOKEN_BUDGETS, compact_captions, compact_external_urls, count_tokens, strip_noise,
+    truncate_tokens,
+)
 
 ###############################################################################
 #                          LOGGING & ENVIRONMENT                              #
@@ -71,19 +82,31 @@ PERPLEXITY_API_KEY = os.getenv("PERPLEXITY_API_KEY", "")
 openai.api_key = OPENAI_API_KEY
 apify          = ApifyClient(APIFY_API_TOKEN)
 N_APIFY_PROFILES_AT_ONCE = 500
-N_LLM_CALLS_AT_ONCE = 10
+CSV_CHUNK_ROWS = 100_000       # rows per pandas chunk when streaming csv_in
+N_APIFY_BATCHES_AHEAD = 1      # bounded queue between scraper and grader (pipeline mode)
+N_LLM_CALLS_AT_ONCE = LLM_MAX_CONCURRENCY   # profiles in flight; the AIMD limiter in utils_llm decides real API calls
+MULTI_GRADE_MAX_PROFILES = 20          # mode "multi": at most K profiles per grading request …
+MULTI_GRADE_TOKEN_BUDGET = 6000        # … and at most this many profile tokens (K is whatever fits)
+MULTI_GRADE_TOKENS_PER_ANSWER = 160    # completion tokens reserved per profile in a multi request
 
 ###############################################################################
 #                    PROMPT BUILDERS  (no more globals!)                      #
 ###############################################################################
 DEFAULT_CFG_PATH = Path(__file__).with_name("prompt_placeholders.yaml")
+if not DEFAULT_CFG_PATH.exists():   # the checked-in copy sits at the repo root
+    DEFAULT_CFG_PATH = Path(__file__).resolve().parent.parent / DEFAULT_CFG_PATH.name
 with DEFAULT_CFG_PATH.open(encoding="utf-8") as f:
     _CFG_DEFAULTS = yaml.safe_load(f)
 
 def build_prompts(
     target_desc: str, target_examples: str, product_desc: str = "",
 ) -> Dict[str, str]:
-    """Return all prompt strings param-substituted with *this* target description."""
+    """
+    Return all prompt strings param-substituted with *this* target description.
+    GRADE_SYS / SCORE_SYS / PERPLEXITY are identical for every profile of a run and
+    always come first (provider prompt caching matches on the prefix); the per-profile
+    GRADE_USER / PERPLEXITY_PROFILE / SCORE_USER templates only follow them.
+    """
     PROMPT_GRADE_SYSTEM_INSTAGRAM = textwrap.dedent(f"""
         You are a lead-qualification expert.
 
@@ -101,6 +124,23 @@ def build_prompts(
         ##Score n
     """).strip()
 
+    PROMPT_GRADE_SYSTEM_MULTI = textwrap.dedent(f"""
+        You are a lead-qualification expert.
+
+        You receive several Instagram profiles, separated by lines of "=====".
+        Give each an **integer score 1-5** assessing whether the instagram user fits
+        the following target audience:
+
+        {target_desc}
+
+        Examples:
+        {target_examples}
+
+        Judge every profile on its own. Return exactly one entry per profile, in
+        input order, with its exact username, a concise argumentation (at most
+        three sentences) and the score.
+    """).strip()
+
     PROMPT_GRADE_USER_INSTAGRAM = textwrap.dedent("""
         Instagram profile
         -----------------
@@ -115,14 +155,12 @@ def build_prompts(
         {captions}
     """).strip()
 
+    # Static for the whole run and sent first, so every enrichment request shares a
+    # byte-identical prefix; the per-profile part (PERPLEXITY_PROFILE) is appended.
     PROMPT_PERPLEXITY = textwrap.dedent(f"""
         You are a lead-qualification expert. The goal is to determine by doing a broader web search if a user with the given Instagram profile
         fits the target audience. The target audience is:
         {target_desc}
-        
-        # Instagram profile
-        The Instagram profile is:
-        {{ig_profile}}
 
         # Output
         Return a table where each site entry has:
@@ -130,12 +168,23 @@ def build_prompts(
           url           – full link
           probability   – 0-1 likelihood it's the same entity
           implication   – What that implies w.r.t. the target audience
-        
+
         In the end return why it would be reasonable that the entity would buy specifically this property and in particular why it is reasonable that this person would react to a cold email proposing this property. be critical.
         Finally if possible try to find a contact email of this person but do not include candidate emails that are only a plausible guess.
-        
+
         # Information about the thing the target audience is looking for
-        {product_desc}        
+        {product_desc}
+    """).strip()
+
+    PROMPT_PERPLEXITY_PROFILE = textwrap.dedent("""
+        # Instagram profile
+        Instagram username: {username}
+
+        The Instagram profile is:
+        {ig_profile}
+
+        IG reasoning:
+        {ig_reasoning}
     """).strip()
 
     PROMPT_GRADE_SYSTEM_FINAL = textwrap.dedent(f"""
@@ -172,11 +221,29 @@ def build_prompts(
     return dict(
         GRADE_SYS=PROMPT_GRADE_SYSTEM_INSTAGRAM,
         GRADE_USER=PROMPT_GRADE_USER_INSTAGRAM,
+        GRADE_MULTI_SYS=PROMPT_GRADE_SYSTEM_MULTI,
         PERPLEXITY=PROMPT_PERPLEXITY,
+        PERPLEXITY_PROFILE=PROMPT_PERPLEXITY_PROFILE,
         SCORE_SYS=PROMPT_GRADE_SYSTEM_FINAL,
         SCORE_USER=PROMPT_GRADE_USER_FINAL,
     )
 
+STATIC_PROMPTS = ("GRADE_SYS", "GRADE_MULTI_SYS", "SCORE_SYS", "PERPLEXITY")
+
+def log_prompt_prefixes(prompts: Dict[str, str]) -> Dict[str, int]:
+    """Log size and fingerprint of the run-static prompt prefixes → {name: tokens}."""
+    sizes = {}
+    for name in STATIC_PROMPTS:
+        text = prompts[name]
+        sizes[name] = count_tokens(text)
+        logger.info(
+            "Static prompt prefix %-10s %5d tokens  sha256 %s%s", name, sizes[name],
+            hashlib.sha256(text.encode("utf-8")).hexdigest()[:12],
+            f"  (below the {PROMPT_CACHE_MIN_TOKENS}-token minimum for OpenAI prompt caching)"
+            if name != "PERPLEXITY" and sizes[name] < PROMPT_CACHE_MIN_TOKENS else "",
+        )
+    return sizes
+
 ###############################################################################
 #                              REGEX & HELPERS                                #
 ###############################################################################
@@ -195,62 +262,381 @@ def extract_score(text: str) -> Optional[int]:
 def batch(lst: List[str], n: int) -> List[List[str]]:
     return [lst[i:i+n] for i in range(0, len(lst), n)]
 
+def iter_handles(csv_in: str | Path, *, chunksize: int = CSV_CHUNK_ROWS) -> Iterator[str]:
+    """
+    Stream cleaned, de-duplicated IG handles from the 'channelName' column.
+    Reads `chunksize` rows at a time and dedups (case-insensitively) through a
+    Bloom filter backed by an on-disk set, so multi-million-row follower exports
+    run in flat memory and the first handles reach the scraper right away.
+    """
+    seen = SeenSet()
+    try:
+        for df in pd.read_csv(csv_in, dtype=str, usecols=["channelName"], chunksize=chunksize):
+            for handle in df["channelName"].fillna("").str.strip().str.lstrip("@"):
+                if handle and seen.add(handle.lower()):
+                    yield handle
+    finally:
+        seen.close()
+
+###############################################################################
+#                              APIFY SCRAPING                                 #
+###############################################################################
+def _scrape_profiles(chunk: List[str]) -> Optional[List[dict]]:
+    """
+    Run one `instagram-profile-scraper` batch to completion.
+    Returns the profiles that have a biography, or None if the Apify run failed.
+    """
+    try:
+        run = apify.actor("apify/instagram-profile-scraper").call(
+            run_input={"usernames": chunk},
+            timeout_secs=1200,
+        )
+        profiles = list(apify.dataset(run["defaultDatasetId"]).iterate_items())
+    except Exception as e:
+        logger.warning("Apify failed for %s… – skipping batch (%s)", chunk[:3], e)
+        return None
+    # Filter out profiles with empty or None 'biography' (description)
+    return [
+        prof for prof in profiles
+        if prof.get("biography") not in ("", None)
+    ]
+
+_PIPELINE_DONE = object()
+
+async def _aiter_scraped_batches(
+    handles: Iterable[str],
+    *,
+    pipelined: bool,
+    batches_ahead: int = N_APIFY_BATCHES_AHEAD,
+) -> AsyncIterator[Tuple[List[str], Optional[List[dict]]]]:
+    """
+    Yield `(chunk, profiles)` for every Apify batch of `handles`.
+    `handles` may be a lazy stream; it is pulled one batch at a time. The blocking
+    CSV reads and Apify client run in a worker thread so the event loop keeps grading.
+
+    pipelined=False → scrape a batch, hand it to the caller, then scrape the next.
+    pipelined=True  → a producer task keeps scraping ahead and parks finished
+                      batches in a queue of at most `batches_ahead` entries, so the
+                      next Apify run overlaps with grading of the current batch.
+    """
+    handles = iter(handles)
+
+    async def _next_chunk() -> List[str]:
+        return await asyncio.to_thread(lambda: list(itertools.islice(handles, N_APIFY_PROFILES_AT_ONCE)))
+
+    if not pipelined:
+        while chunk := await _next_chunk():
+            yield chunk, await asyncio.to_thread(_scrape_profiles, chunk)
+        return
+
+    buf: asyncio.Queue = asyncio.Queue(maxsize=max(1, batches_ahead))
+
+    async def _producer() -> None:
+        try:
+            while chunk := await _next_chunk():
+                await buf.put((chunk, await asyncio.to_thread(_scrape_profiles, chunk)))
+        except Exception as e:
+            logger.error("Apify producer crashed – %s", e)
+        await buf.put(_PIPELINE_DONE)
+
+    producer = asyncio.create_task(_producer())
+    try:
+        while (item := await buf.get()) is not _PIPELINE_DONE:
+            yield item
+    finally:
+        producer.cancel()
+
+###############################################################################
+#                            CHECKPOINT JOURNAL                               #
+###############################################################################
+def default_checkpoint_path(csv_path: str | Path) -> Path:
+    """`leads_scored.csv` → `leads_scored.checkpoint.jsonl` next to it."""
+    return Path(csv_path).with_suffix(".checkpoint.jsonl")
+
+class CheckpointJournal:
+    """
+    Append-only JSONL journal of finished handles.
+    One line per `_process_profile` result, plus `{"username": …, "skipped": …}`
+    markers for handles Apify returned nothing usable for, so a resumed run
+    neither re-grades nor re-scrapes them. Batch-mode jobs are journaled as
+    `{"batch_id": …}` when submitted and `{"batch_done": …}` once consumed;
+    `pending_batches` lists the ones a resumed run should reattach to.
+    """
+
+    def __init__(self, path: str | Path, *, resume: bool = False) -> None:
+        self.path = Path(path)
+        self.results: list[dict[str, Any]] = []
+        self.done: set[str] = set()
+        self.pending_batches: list[str] = []
+        if resume and self.path.exists():
+            self._load()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._fh = self.path.open("a" if resume else "w", encoding="utf-8")
+
+    def _load(self) -> None:
+        with self.path.open(encoding="utf-8") as fh:
+            for line in fh:
+                try:
+                    rec = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # torn last line from a crash
+                if "batch_id" in rec:
+                    self.pending_batches.append(rec["batch_id"])
+                    continue
+                if "batch_done" in rec:
+                    self.pending_batches = [b for b in self.pending_batches if b != rec["batch_done"]]
+                    continue
+                self.done.add(str(rec.get("username", "")).lower())
+                if not rec.get("skipped"):
+                    self.results.append(rec)
+        logger.info("Checkpoint %s: %d handle(s) already done, %d unfinished batch(es)",
+                    self.path, len(self.done), len(self.pending_batches))
+
+    def is_done(self, handle: str) -> bool:
+        return handle.lower() in self.done
+
+    def record(self, result: dict[str, Any]) -> None:
+        self._write(result)
+        self.results.append(result)
+
+    def record_skipped(self, handle: str, reason: str) -> None:
+        self._write({"username": handle, "skipped": reason})
+
+    def record_batch(self, batch_id: str) -> None:
+        self._append({"batch_id": batch_id})
+
+    def record_batch_done(self, batch_id: str) -> None:
+        self._append({"batch_done": batch_id})
+        self.pending_batches = [b for b in self.pending_batches if b != batch_id]
+
+    def _write(self, rec: dict[str, Any]) -> None:
+        self.done.add(str(rec.get("username", "")).lower())
+        self._append(rec)
+
+    def _append(self, rec: dict[str, Any]) -> None:
+        self._fh.write(json.dumps(rec, ensure_ascii=False, default=str) + "\n")
+        self._fh.flush()
+
+    def close(self) -> None:
+        self._fh.close()
+
 ###############################################################################
 #                         GPT & PERPLEXITY HELPERS                            #
 ###############################################################################
-def _process_profile(
+def _grade_messages(
+    prof: dict[str, Any], prompts: dict[str, str], budgets: Optional[Dict[str, int]] = None,
+) -> Tuple[str, List[dict]]:
+    """
+    First-pass grading request for one profile → (user_msg, messages).
+    `budgets` – per-field token budgets (utils_prompt); captions / hashtags are
+                deduplicated and emoji / URL noise stripped. None ⇢ raw fields,
+                captions cut at 2000 chars.
+    """
+    if budgets is None:
+        captions = "\n".join(p.get("caption", "") for p in prof.get("latestPosts", []))[:2000]
+        biography = prof.get("biography", "")
+        external_urls = prof.get("externalUrls", "")
+    else:
+        captions = compact_captions(
+            prof.get("latestPosts", []), budgets.get("captions"), budgets.get("hashtags"),
+        )
+        biography = truncate_tokens(strip_noise(prof.get("biography", "")), budgets.get("biography"))
+        external_urls = compact_external_urls(prof.get("externalUrls"), budgets.get("external_urls"))
+    user_msg = prompts["GRADE_USER"].format(
+        username=prof.get("username", "unknown"),
+        full_name=prof.get("fullName", ""),
+        location=prof.get("location", ""),
+        biography=biography,
+        external_urls=external_urls,
+        captions=captions,
+    )
+    return user_msg, [
+        {"role": "system", "content": prompts["GRADE_SYS"]},
+        {"role": "user",   "content": user_msg},
+    ]
+
+GRADE_MULTI_SEPARATOR = "\n\n=====\n\n"
+GRADE_MULTI_SCHEMA = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "profile_grades",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "grades": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "username":  {"type": "string"},
+                            "reasoning": {"type": "string"},
+                            "score":     {"type": "integer"},
+                        },
+                        "required": ["username", "reasoning", "score"],
+                        "additionalProperties": False,
+                    },
+                },
+            },
+            "required": ["grades"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+def pack_profiles(
+    items: List[Tuple[str, str]], *, token_budget: int = MULTI_GRADE_TOKEN_BUDGET,
+    max_profiles: int = MULTI_GRADE_MAX_PROFILES,
+) -> List[List[Tuple[str, str]]]:
+    """
+    Greedily group (username, user_msg) pairs so each group's messages fit
+    `token_budget` tokens and hold at most `max_profiles` profiles. A profile
+    larger than the budget gets a group of its own.
+    """
+    groups: List[List[Tuple[str, str]]] = []
+    group: List[Tuple[str, str]] = []
+    used = 0
+    for item in items:
+        tokens = count_tokens(item[1])
+        if group and (used + tokens > token_budget or len(group) >= max_profiles):
+            groups.append(group)
+            group, used = [], 0
+        group.append(item)
+        used += tokens
+    if group:
+        groups.append(group)
+    return groups
+
+def parse_multi_grades(text: str, usernames: List[str]) -> Dict[str, str]:
+    """
+    JSON reply of a multi-profile request → {username: "reasoning\n##Score n"}
+    (the single-grade text format, so `_aprocess_profile` can take it as
+    `first_pass`). Entries with an unknown username or a score outside 1-5 are
+    dropped; unparsable JSON yields {}.
+    """
+    try:
+        entries = json.loads(text or "").get("grades", [])
+    except (ValueError, AttributeError):
+        return {}
+    wanted = {u.lower().lstrip("@"): u for u in usernames}
+    graded: Dict[str, str] = {}
+    for entry in entries if isinstance(entries, list) else []:
+        if not isinstance(entry, dict):
+            continue
+        uname = wanted.get(str(entry.get("username", "")).strip().lower().lstrip("@"))
+        score = entry.get("score")
+        if uname is None or uname in graded or isinstance(score, bool) or score not in range(1, 6):
+            continue
+        graded[uname] = f"{str(entry.get('reasoning', '')).strip()}\n##Score {score}"
+    return graded
+
+async def _agrade_many(
+    group: List[Tuple[str, str]],
+    *,
+    prompts: dict[str, str],
+    use_cache: bool = False,
+    stats: Optional[Counter] = None,
+) -> Dict[str, str]:
+    """
+    Grade K profiles in one request → {username: grade text}.
+    Profiles missing from a malformed / incomplete reply are retried in smaller
+    requests (the missing ones, or each half when nothing came back). A profile
+    that still fails on its own is left out and gets the regular single grade.
+    """
+    usernames = [uname for uname, _ in group]
+    messages = [
+        {"role": "system", "content": prompts["GRADE_MULTI_SYS"]},
+        {"role": "user",   "content": GRADE_MULTI_SEPARATOR.join(msg for _, msg in group)},
+    ]
+    graded: Dict[str, str] = {}
+    try:
+        # the shared request is billed to its profiles by the size of their part of the prompt
+        with llm_labels(stage="grade_multi", shares={uname: count_tokens(msg) for uname, msg in group}):
+            text = await agpt_chat(
+                messages,
+                max_tokens=MULTI_GRADE_TOKENS_PER_ANSWER * len(group) + 100,
+                cache=use_cache,
+                response_format=GRADE_MULTI_SCHEMA,
+            )
+        graded = parse_multi_grades(text, usernames)
+    except Exception as exc:
+        logger.warning("Multi grade of %d profiles failed – %s", len(group), exc)
+    if stats is not None:
+        stats["multi_requests"] += 1
+
+    missing = [item for item in group if item[0] not in graded]
+    if not missing or len(group) == 1:
+        return graded
+    logger.info("Multi grade returned %d/%d profiles; retrying the rest in smaller requests",
+                len(graded), len(group))
+    if stats is not None:
+        stats["multi_retried"] += len(missing)
+    if len(missing) == len(group):
+        half = len(group) // 2
+        retries = [group[:half], group[half:]]
+    else:
+        retries = [missing]
+    for part in await asyncio.gather(
+        *(_agrade_many(sub, prompts=prompts, use_cache=use_cache, stats=stats) for sub in retries)
+    ):
+        graded.update(part)
+    return graded
+
+async def _aprocess_profile(
     prof: dict[str, Any],
     *,
     prompts: dict[str, str],
     use_perplexity: bool,
+    use_cache: bool = False,
+    first_pass: Optional[str] = None,
+    stats: Optional[Counter] = None,
+    budgets: Optional[Dict[str, int]] = None,
 ) -> dict[str, Any]:
     """
-    Runs **inside a worker thread**.
+    Runs as **one task on the event loop** (hundreds run concurrently).
     Does:  profile → GPT grade → (opt) Perplexity → GPT re-score
     Returns one results-dict that is identical to what you were appending before.
+    `first_pass` – GPT grade text already obtained elsewhere (Batch API); skips step 1.
+    `stats`      – per-stage counters, bumped for graded / enriched / rescored.
+    `budgets`    – per-field token budgets for the grade prompt and for the IG
+                   reasoning / enrichment pasted into later prompts (None ⇢ raw).
     """
     uname = prof.get("username", "unknown")
-    captions = "\n".join(p.get("caption", "") for p in prof.get("latestPosts", []))
 
     # 1) first grade -----------------------------------------------
-    user_msg = prompts["GRADE_USER"].format(
-        username=uname,
-        full_name=prof.get("fullName", ""),
-        location=prof.get("location", ""),
-        biography=prof.get("biography", ""),
-        external_urls=prof.get("externalUrls", ""),
-        captions=captions[:2000],
-    )
+    user_msg, messages = _grade_messages(prof, prompts, budgets)
     ig_text   = ""
     base_score = None
+    grade_failed = False
     
     enrich_prompt = None
     base_prompt = None
     final_prompt = None
+    final_text = ""
     
     try:
-        messages = [
-                {"role": "system", "content": prompts["GRADE_SYS"]},
-                {"role": "user",   "content": user_msg},
-            ]
-        ig_text = gpt_chat(
-            messages
-        )
+        with llm_labels(stage="grade", profile=uname):
+            ig_text = first_pass if first_pass is not None else await agpt_chat(
+                messages,
+                cache=use_cache,
+            )
         base_prompt = str(messages)
         base_score = extract_score(ig_text)
     except Exception as exc:
         logger.error("GPT grade failed for @%s – %s", uname, exc)
         ig_text = str(exc)
+        grade_failed = True
+    ig_reasoning = ig_text if budgets is None else truncate_tokens(ig_text, budgets.get("ig_reasoning"))
 
     # 2) optional Perplexity enrichment ---------------------------
     enrichment = ""
     if use_perplexity and PERPLEXITY_API_KEY:
         try:
-            enrich_prompt = (
-                f"Instagram username: {uname}\n\nIG reasoning:\n{ig_text}\n\n"
-                f"{prompts['PERPLEXITY'].format(ig_profile=user_msg)}"
+            enrich_prompt = prompts["PERPLEXITY"] + "\n\n" + prompts["PERPLEXITY_PROFILE"].format(
+                username=uname, ig_profile=user_msg, ig_reasoning=ig_reasoning,
             )
-            enrichment = query_perplexity(enrich_prompt)
+            with llm_labels(stage="enrich", profile=uname):
+                enrichment = await aquery_perplexity(enrich_prompt, cache=use_cache)
         except Exception as exc:
             logger.warning("Perplexity failed for @%s – %s", uname, exc)
 
@@ -263,45 +649,115 @@ def _process_profile(
                     {
                         "role": "user",
                         "content": prompts["SCORE_USER"].format(
-                            ig_reasoning=ig_text, enrichment=enrichment, ig_profile=user_msg
+                            ig_reasoning=ig_reasoning,
+                            enrichment=enrichment if budgets is None
+                            else truncate_tokens(enrichment, budgets.get("enrichment")),
+                            ig_profile=user_msg,
                         ),
                     },
                 ]
             final_prompt = str(messages)
-            final_text = gpt_chat(
-                messages,
-                temperature=0.2,
-            )
+            with llm_labels(stage="rescore", profile=uname):
+                final_text = await agpt_chat(
+                    messages,
+                    temperature=0.2,
+                    cache=use_cache,
+                )
             final_score = extract_score(final_text) or base_score
         except Exception as exc:
             logging.warning("Re-score GPT failed for @%s – %s", uname, exc)
 
     logger.info(" → @%-20s  score %s", uname, final_score)
-    return dict(
-        username   = uname,
+    if stats is not None:
+        stats["graded"] += 1
+        stats["enriched"] += bool(enrichment)
+        stats["rescored"] += bool(final_text)
+    return _result_row(
+        prof,
         score      = final_score,
         reasoning  = ig_text,
         enrichment = enrichment,
+        enrich_prompt = enrich_prompt,
+        base_prompt = base_prompt,
+        final_prompt = final_prompt,
+        final_reasoning = final_text if final_text else "",
+        stage      = "grade_failed" if grade_failed else "rescore" if final_text else "grade",
+    )
+
+def _result_row(prof: dict[str, Any], **fields: Any) -> dict[str, Any]:
+    """One output row; every stage of the cascade emits the same columns."""
+    now = datetime.now(timezone.utc).isoformat()
+    row = dict(
+        username   = prof.get("username", "unknown"),
+        score      = None,
+        reasoning  = "",
+        enrichment = "",
         biography  = prof.get("biography", ""),
         location   = prof.get("location", ""),
         external_urls = prof.get("externalUrls", ""),
         full_name  = prof.get("fullName", ""),
-        captions   = captions,
+        captions   = "\n".join(p.get("caption", "") for p in prof.get("latestPosts", [])),
         latestPosts = prof.get("latestPosts", []),
-        createdAt  = datetime.now(timezone.utc).isoformat(),
-        updatedAt  = datetime.now(timezone.utc).isoformat(),
-        enrichmentCreatedAt = datetime.now(timezone.utc).isoformat(),
-        enrichmentUpdatedAt = datetime.now(timezone.utc).isoformat(),
-        enrich_prompt = enrich_prompt,
-        base_prompt = base_prompt,
-        final_prompt = final_prompt,
-        final_reasoning = final_text if final_text else "",
+        createdAt  = now,
+        updatedAt  = now,
+        enrichmentCreatedAt = now,
+        enrichmentUpdatedAt = now,
+        enrich_prompt = None,
+        base_prompt = None,
+        final_prompt = None,
+        final_reasoning = "",
+        stage      = "",
     )
+    row.update(fields)
+    return row
+
+###############################################################################
+#                          CASCADE PREFILTER                                  #
+###############################################################################
+PREFILTER_KEYWORDS = "keywords"
+PREFILTER_EXCLUDE_KEYWORDS: List[str] = _CFG_DEFAULTS.get("PREFILTER_EXCLUDE_KEYWORDS") or []
+
+def keyword_prefilter(prof: dict[str, Any], exclude: List[str] = PREFILTER_EXCLUDE_KEYWORDS) -> Tuple[int, str]:
+    """
+    Local, free screen: score 1 if the profile matches an exclusion keyword
+    (agencies, listings … per PREFILTER_EXCLUDE_KEYWORDS), otherwise a neutral 3.
+    """
+    haystack = " ".join(
+        str(prof.get(k) or "") for k in ("username", "fullName", "biography", "businessCategoryName")
+    ).lower()
+    for kw in exclude:
+        if kw.lower() in haystack:
+            return 1, f"prefilter: matched exclusion keyword {kw!r}"
+    return 3, "prefilter: no exclusion keyword"
+
+async def _aprefilter_profile(
+    prof: dict[str, Any],
+    *,
+    prompts: dict[str, str],
+    prefilter: str,
+    use_cache: bool = False,
+    budgets: Optional[Dict[str, int]] = None,
+) -> Tuple[Optional[int], str]:
+    """
+    Stage 0 of the cascade → (score, reasoning).
+    `prefilter` is either "keywords" or the name of a cheap chat model that
+    gets the same grading prompt. A None score means "could not tell" → pass on.
+    """
+    if prefilter == PREFILTER_KEYWORDS:
+        return keyword_prefilter(prof)
+    _, messages = _grade_messages(prof, prompts, budgets)
+    try:
+        with llm_labels(stage="prefilter", profile=prof.get("username", "unknown")):
+            text = await agpt_chat(messages, model=prefilter, temperature=0.0, max_tokens=300, cache=use_cache)
+    except Exception as exc:
+        logger.warning("Prefilter failed for @%s – %s", prof.get("username", "unknown"), exc)
+        return None, ""
+    return extract_score(text), text
 
 ###############################################################################
 #                              CORE FUNCTION                                  #
 ###############################################################################
-def score_leads(
+async def ascore_leads(
     *,
     target_desc: str  = _CFG_DEFAULTS["TARGET_AUDIENCE_DESCRIPTION"],
     target_examples: str = _CFG_DEFAULTS["TARGET_AUDIENCE_EXAMPLES"],
@@ -311,86 +767,228 @@ def score_leads(
     csv_out: str | Path | None = None,
     max_handles: int | None = None,
     min_filter_score: int = 1,
+    pipelined: bool = False,
+    use_cache: bool = False,
+    checkpoint: str | Path | None = None,
+    resume: bool = False,
+    max_in_flight: int = N_LLM_CALLS_AT_ONCE,
+    mode: str = "online",
+    batch_dir: str | Path = "batches",
+    batch_runner: Optional[Callable[[Path], Dict[str, str]]] = None,
+    prefilter: Optional[str] = None,
+    prefilter_threshold: int = 2,
+    lead_store: str | Path | None = None,
+    stale_after_days: float | None = 30,
+    metrics_path: str | Path | None = None,
+    token_budgets: Optional[Dict[str, int]] = None,
+    multi_max_profiles: int = MULTI_GRADE_MAX_PROFILES,
+    multi_token_budget: int = MULTI_GRADE_TOKEN_BUDGET,
 ) -> pd.DataFrame:
     """
-    Parameters
-    ----------
-    target_desc        – short paragraph describing the exact audience
-    target_examples    – bullet list / examples (optional but boosts GPT accuracy)
-    use_perplexity     – False ⇢ skip the web-enrichment step entirely
-    csv_in             – file with column 'channelName' holding the IG handles
-    csv_out            – if given, write the resulting DataFrame to this CSV
-    max_handles        – dev helper: limit how many handles to process
-    min_filter_score   – only return handles with a score ≥ this value
-
-    Returns
-    -------
-    pandas.DataFrame with columns:
-        username, score, reasoning, enrichment
+    Async engine behind `score_leads` (same parameters and result, documented there):
+    one event loop grades up to `max_in_flight` profiles at once on the async
+    OpenAI / httpx clients.
     """
 
+    if mode not in ("online", "batch", "multi"):
+        raise ValueError(f"mode must be 'online', 'batch' or 'multi', not {mode!r}")
     csv_in = Path(csv_in)
     if not csv_in.exists():
         raise FileNotFoundError(csv_in)
 
-    prompts = build_prompts(target_desc, target_examples, product_desc="")
+    prompts = build_prompts(target_desc, target_examples, product_desc=product_desc)
+    log_prompt_prefixes(prompts)
 
-    # ─── read & validate handles ──────────────────────────────────────────────
-    df_src = (
-        pd.read_csv(csv_in, dtype=str)
-          .fillna("")
-          .assign(channelName=lambda d: d["channelName"].str.strip().str.lstrip("@"))
-          .query("channelName != ''")
-          .drop_duplicates("channelName")
-    )
-    if df_src.empty:
-        raise ValueError("No usable 'channelName' entries in input CSV")
+    stats: Counter = Counter()
+    metrics = LLMMetrics()
+
+    # ─── stream & validate handles ────────────────────────────────────────────
+    def _counted(stream: Iterable[str]) -> Iterator[str]:
+        for h in stream:
+            stats["handles"] += 1
+            yield h
 
-    handles = df_src["channelName"].tolist()
+    handles: Iterator[str] = _counted(iter_handles(csv_in))
     if max_handles:
-        handles = handles[:max_handles]
-    logger.info("Processing %d Instagram handles …", len(handles))
-    results: list[dict[str, Any]] = []
+        handles = itertools.islice(handles, max_handles)
+
+    if checkpoint is None and (csv_out or resume):
+        checkpoint = default_checkpoint_path(csv_out or csv_in)
+    journal = CheckpointJournal(checkpoint, resume=resume) if checkpoint else None
+    if journal:
+        handles = (h for h in handles if not journal.is_done(h))
+
+    store = LeadStore(lead_store) if lead_store else None
+    if store:
+        def _stale(stream: Iterable[str]) -> Iterator[str]:
+            for h in stream:
+                if store.needs_enrichment(h, stale_after_days):
+                    yield h
+                else:
+                    stats["fresh"] += 1
+        handles = _stale(handles)
+
+    logger.info("Streaming Instagram handles from %s …", csv_in)
+    results: list[dict[str, Any]] = list(journal.results) if journal else []
     
-    pbar = tqdm(total=len(handles), desc="Processing leads")  # overall progress bar
+    pbar = tqdm(total=max_handles, desc="Processing leads")  # overall progress bar
     
-    for chunk in batch(handles, N_APIFY_PROFILES_AT_ONCE):
-        try:
-            run = apify.actor("apify/instagram-profile-scraper").call(
-                run_input={"usernames": chunk},
-                timeout_secs=1200,
-            )
-            profiles = list(apify.dataset(run["defaultDatasetId"]).iterate_items())
-            # Filter out profiles with empty or None 'biography' (description)
-            profiles = [
-                prof for prof in profiles
-                if prof.get("biography") not in ("", None)
-            ]
-        except Exception as e:
-            logger.warning("Apify failed for %s… – skipping batch (%s)", chunk[:3], e)
-            pbar.update(len(chunk))
-            continue
+    sem = asyncio.Semaphore(max(1, max_in_flight))
 
-        with ThreadPoolExecutor(max_workers=N_LLM_CALLS_AT_ONCE) as pool:
-            future_to_uname = {
-                pool.submit(
-                    _process_profile,
+    def _record(res: dict[str, Any]) -> None:
+        failed = res.get("stage") == "grade_failed"   # stays open for --resume and the lead store
+        if journal and not failed:
+            journal.record(res)
+        if store and not failed:
+            store.mark_scraped(res["username"], score=res.get("score"), stage=res.get("stage"))
+        results.append(res)
+
+    async def _grade(prof: dict[str, Any], first_pass: Optional[str]) -> dict[str, Any]:
+        async with sem:
+            with metrics.collect():
+                return await _aprocess_profile(
                     prof,
                     prompts=prompts,
                     use_perplexity=use_perplexity,
-                ): prof.get("username", "unknown")
-                for prof in profiles
-            }
-            for fut in as_completed(future_to_uname):
-                try:
-                    results.append(fut.result())
-                except Exception as exc:
-                    logger.error("Worker failed – %s", exc)
+                    use_cache=use_cache,
+                    first_pass=first_pass,
+                    stats=stats,
+                    budgets=token_budgets,
+                )
+
+    async def _screen_one(prof: dict[str, Any]) -> Tuple[Optional[int], str]:
+        async with sem:
+            with metrics.collect():
+                return await _aprefilter_profile(
+                    prof, prompts=prompts, prefilter=prefilter, use_cache=use_cache, budgets=token_budgets,
+                )
+
+    async def _screen(profiles: List[dict]) -> List[dict]:
+        """Cascade stage 0: record rejects right away, return the profiles worth grading."""
+        stats["scraped"] += len(profiles)
+        if not prefilter:
+            return profiles
+        verdicts = await asyncio.gather(*(_screen_one(prof) for prof in profiles))
+        keep: List[dict] = []
+        for prof, (score, text) in zip(profiles, verdicts):
+            if score is not None and score < prefilter_threshold:
+                _record(_result_row(prof, score=score, reasoning=text, stage="prefilter"))
+                stats["rejected"] += 1
                 pbar.update(1)
-    pbar.close()
+            else:
+                keep.append(prof)
+        stats["passed"] += len(keep)
+        return keep
+
+    async def _grade_group(group: List[Tuple[str, str]]) -> Dict[str, str]:
+        async with sem:
+            with metrics.collect():
+                return await _agrade_many(group, prompts=prompts, use_cache=use_cache, stats=stats)
+
+    async def _grade_multi(profiles: List[dict]) -> Dict[str, str]:
+        """Mode "multi": first-pass grades for all profiles, K per request."""
+        items = [(prof.get("username", "unknown"), _grade_messages(prof, prompts, token_budgets)[0]) for prof in profiles]
+        groups = pack_profiles(items, token_budget=multi_token_budget, max_profiles=multi_max_profiles)
+        first_pass: Dict[str, str] = {}
+        for part in await asyncio.gather(*(_grade_group(group) for group in groups)):
+            first_pass.update(part)
+        logger.info("Multi grade: %d/%d profiles in %d request(s) (+ retries); the rest go online",
+                    len(first_pass), len(items), len(groups))
+        return first_pass
+
+    async def _grade_all(profiles: List[dict], first_pass: Dict[str, str]) -> None:
+        tasks = [_grade(prof, first_pass.get(prof.get("username", "unknown"))) for prof in profiles]
+        for fut in asyncio.as_completed(tasks):
+            try:
+                _record(await fut)
+            except Exception as exc:
+                logger.error("Worker failed – %s", exc)
+            pbar.update(1)
+
+    scraped: Dict[str, dict] = {}      # batch mode: every profile, graded after the scrape
+    try:
+        async for chunk, profiles in _aiter_scraped_batches(handles, pipelined=pipelined):
+            if profiles is None:
+                pbar.update(len(chunk))
+                continue
+
+            if journal or store:
+                returned = {str(prof.get("username", "")).lower() for prof in profiles}
+                missing = [h for h in chunk if h.lower() not in returned]
+                for h in missing:
+                    if journal:
+                        journal.record_skipped(h, "no_profile")
+                    if store:
+                        store.mark_scraped(h, stage="no_profile")
+                pbar.update(len(missing))
+
+            profiles = await _screen(profiles)
+            if mode == "batch":
+                scraped.update((prof.get("username", "unknown"), prof) for prof in profiles)
+                continue
+            await _grade_all(profiles, await _grade_multi(profiles) if mode == "multi" else {})
+
+        if scraped:
+            submitted: List[str] = []
+            reattach = list(journal.pending_batches) if journal else []
+
+            def _submitted(batch_id: str) -> None:   # persisted at once: a crash during the wait can reattach
+                submitted.append(batch_id)
+                if journal:
+                    journal.record_batch(batch_id)
+
+            if reattach:
+                logger.info("Reattaching to %d batch(es) of the interrupted run: %s", len(reattach), reattach)
+            # to_thread copies the labels and the metrics sink into the worker thread
+            with metrics.collect(), llm_labels(stage="grade_batch"):
+                first_pass = await asyncio.to_thread(
+                    batch_chat,
+                    [(uname, _grade_messages(prof, prompts, token_budgets)[1]) for uname, prof in scraped.items()],
+                    batch_dir,
+                    cache=use_cache,
+                    runner=batch_runner,
+                    on_submit=_submitted,
+                    reattach=reattach,
+                )
+            if journal:
+                for batch_id in reattach + submitted:
+                    journal.record_batch_done(batch_id)
+            logger.info("Batch API graded %d/%d profiles; the rest go online", len(first_pass), len(scraped))
+            await _grade_all(list(scraped.values()), first_pass)
+    finally:
+        pbar.close()
+        if journal:
+            journal.close()
+        if store:
+            logger.info("Lead store %s: %d fresh handle(s) skipped, %s", store.path, stats["fresh"], store.stats())
+            store.close()
+        await aclose_clients()
+    if not stats["handles"]:
+        raise ValueError("No usable 'channelName' entries in input CSV")
+    if prefilter:
+        logger.info(
+            "Cascade: %d scraped → %d rejected by %s → %d graded → %d enriched → %d re-scored",
+            stats["scraped"], stats["rejected"], prefilter, stats["graded"], stats["enriched"], stats["rescored"],
+        )
+    if use_cache:
+        logger.info("LLM cache: %(hits)d hit(s), %(misses)d miss(es)", get_default_cache().stats())
     df_out = pd.DataFrame(results)
+    usage = metrics.summary()
+    if not usage.empty and not df_out.empty:
+        logger.info("LLM usage this run:\n%s", usage.to_string(index=False, float_format=lambda x: f"{x:.4g}"))
+        for row in usage.itertuples():
+            if row.prompt_tokens:
+                logger.info("Prompt cache %-9s %-12s %5.1f%% of prompt tokens cached",
+                            row.stage, row.model, 100 * row.cached_share)
+        per_profile = metrics.per_profile().rename(columns={"profile": "username"})
+        df_out = df_out.merge(per_profile, on="username", how="left")
+    if metrics_path:
+        logger.info("LLM metrics → %s", metrics.write_prometheus(metrics_path).resolve())
     #Filter out low scores
-    df_out = df_out[df_out["score"].apply(lambda x: x is not None and x >= min_filter_score)]
+    if not df_out.empty:   # empty when the lead store / journal already covered every handle
+        df_out = df_out[df_out["score"].apply(lambda x: x is not None and x >= min_filter_score)]
+    df_out.attrs["stage_counts"] = dict(stats)
+    df_out.attrs["llm_metrics"] = usage
 
     
 
@@ -402,6 +1000,126 @@ def score_leads(
 
     return df_out
 
+def _run_sync(coro: Coroutine[Any, Any, Any]) -> Any:
+    """asyncio.run, but also usable when the caller already sits in a loop (Jupyter)."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    with ThreadPoolExecutor(max_workers=1) as ex:
+        return ex.submit(asyncio.run, coro).result()
+
+def score_leads(
+    *,
+    target_desc: str  = _CFG_DEFAULTS["TARGET_AUDIENCE_DESCRIPTION"],
+    target_examples: str = _CFG_DEFAULTS["TARGET_AUDIENCE_EXAMPLES"],
+    product_desc: str = "",
+    use_perplexity: bool = True,
+    csv_in: str | Path = "leads.csv",
+    csv_out: str | Path | None = None,
+    max_handles: int | None = None,
+    min_filter_score: int = 1,
+    pipelined: bool = False,
+    use_cache: bool = False,
+    checkpoint: str | Path | None = None,
+    resume: bool = False,
+    max_in_flight: int = N_LLM_CALLS_AT_ONCE,
+    mode: str = "online",
+    batch_dir: str | Path = "batches",
+    batch_runner: Optional[Callable[[Path], Dict[str, str]]] = None,
+    prefilter: Optional[str] = None,
+    prefilter_threshold: int = 2,
+    lead_store: str | Path | None = None,
+    stale_after_days: float | None = 30,
+    metrics_path: str | Path | None = None,
+    token_budgets: Optional[Dict[str, int]] = None,
+    multi_max_profiles: int = MULTI_GRADE_MAX_PROFILES,
+    multi_token_budget: int = MULTI_GRADE_TOKEN_BUDGET,
+) -> pd.DataFrame:
+    """
+    Scrape the handles in `csv_in`, grade them and return the scored leads. Blocking
+    wrapper around `ascore_leads` (inside async code await that one directly).
+
+    Parameters
+    ----------
+    target_desc        – short paragraph describing the exact audience
+    target_examples    – bullet list / examples (optional but boosts GPT accuracy)
+    use_perplexity     – False ⇢ skip the web-enrichment step entirely
+    csv_in             – file with column 'channelName' holding the IG handles
+    csv_out            – if given, write the resulting DataFrame to this CSV
+    max_handles        – dev helper: limit how many handles to process
+    min_filter_score   – only return handles with a score ≥ this value
+    pipelined          – True ⇢ scrape the next Apify batch while the current one
+                         is being graded (bounded by N_APIFY_BATCHES_AHEAD)
+    use_cache          – True ⇢ serve identical GPT / Perplexity requests from the
+                         on-disk response cache (LLM_CACHE_PATH)
+    checkpoint         – JSONL journal every finished handle is appended to
+                         (default: next to csv_out, or csv_in when resuming)
+    resume             – True ⇢ load the journal and skip handles already in it
+    max_in_flight      – cap on profiles being graded concurrently
+    mode               – "online" ⇢ every GPT call is interactive
+                         "batch"  ⇢ scrape everything, send all first-pass grades
+                         through the OpenAI Batch API (½ price), then enrich/re-score
+                         "multi"  ⇢ first-pass grades for up to `multi_max_profiles`
+                         profiles per request (JSON schema reply), then enrich/re-score
+    batch_dir          – where batch request JSONL files are written
+    batch_runner       – callable(jsonl_path) → {username: grade text}; replaces the
+                         Batch endpoint (local stub in tests)
+    prefilter          – cascade stage 0: "keywords" (local exclusion list) or a cheap
+                         model name such as "gpt-4o-mini"; None ⇢ no cascade
+    prefilter_threshold– profiles the prefilter scores below this skip the gpt-4o
+                         grade and Perplexity; their prefilter score is kept
+    lead_store         – SQLite lead store (utils_leadstore) shared with buying_leads;
+                         handles scraped there within `stale_after_days` are skipped
+                         and every result is written back
+    stale_after_days   – re-enrich stored handles older than this (None ⇢ never)
+    metrics_path       – write the run's LLM token / latency / cost counters here in
+                         Prometheus text format
+    token_budgets      – per-field token budgets (e.g. utils_prompt.TOKEN_BUDGETS) used
+                         to compact the grade / enrich / re-score prompts; None (default)
+                         ⇢ send the raw fields. Opt-in until bench_prompt_budget --grade
+                         shows the compacted prompts score like the raw ones
+    multi_max_profiles – mode "multi": upper bound on profiles per grading request
+    multi_token_budget – mode "multi": profile tokens packed into one request; K per
+                         request is however many profiles fit
+
+    Per-stage counts are logged and returned in `df.attrs["stage_counts"]`; the
+    per stage/model LLM usage table (utils_metrics) is logged and returned in
+    `df.attrs["llm_metrics"]`, and per-profile llm_calls / tokens / cost_usd
+    columns are added to the rows scored in this run.
+
+    Returns
+    -------
+    pandas.DataFrame with columns:
+        username, score, reasoning, enrichment
+    """
+    return _run_sync(ascore_leads(
+        target_desc=target_desc,
+        target_examples=target_examples,
+        product_desc=product_desc,
+        use_perplexity=use_perplexity,
+        csv_in=csv_in,
+        csv_out=csv_out,
+        max_handles=max_handles,
+        min_filter_score=min_filter_score,
+        pipelined=pipelined,
+        use_cache=use_cache,
+        checkpoint=checkpoint,
+        resume=resume,
+        max_in_flight=max_in_flight,
+        mode=mode,
+        batch_dir=batch_dir,
+        batch_runner=batch_runner,
+        prefilter=prefilter,
+        prefilter_threshold=prefilter_threshold,
+        lead_store=lead_store,
+        stale_after_days=stale_after_days,
+        metrics_path=metrics_path,
+        token_budgets=token_budgets,
+        multi_max_profiles=multi_max_profiles,
+        multi_token_budget=multi_token_budget,
+    ))
+
 ###############################################################################
 #                               CLI FACADE                                    #
 ###############################################################################
@@ -412,12 +1130,59 @@ if __name__ == "__main__":
     p.add_argument("--csv-out", help="Write results here")
     p.add_argument("--no-perp", action="store_true", help="Skip Perplexity step")
     p.add_argument("--max", type=int, help="Limit number of handles (dev)")
+    p.add_argument("--checkpoint", help="JSONL journal path (default: <csv-out>.checkpoint.jsonl)")
+    p.add_argument("--resume", action="store_true",
+                   help="Skip handles already recorded in the checkpoint journal")
+    p.add_argument("--mode", choices=("online", "batch", "multi"), default="online",
+                   help="batch ⇢ first-pass grading via the OpenAI Batch API (cheaper, slower); "
+                        "multi ⇢ several profiles per grading request")
+    p.add_argument("--multi-max", type=int, default=MULTI_GRADE_MAX_PROFILES,
+                   help=f"--mode multi: max profiles per request (default {MULTI_GRADE_MAX_PROFILES})")
+    p.add_argument("--multi-tokens", type=int, default=MULTI_GRADE_TOKEN_BUDGET,
+                   help=f"--mode multi: profile tokens per request (default {MULTI_GRADE_TOKEN_BUDGET})")
+    p.add_argument("--prefilter",
+                   help="Cascade stage 0: 'keywords' or a cheap model (e.g. gpt-4o-mini)")
+    p.add_argument("--prefilter-threshold", type=int, default=2,
+                   help="Prefilter scores below this skip the expensive grade (default 2)")
+    p.add_argument("--cache", action="store_true",
+                   help="Reuse cached GPT / Perplexity responses for identical prompts")
+    p.add_argument("--pipeline", action="store_true",
+                   help="Overlap Apify scraping of the next batch with grading of the current one")
+    p.add_argument("--lead-store", nargs="?", const=LEAD_STORE_PATH,
+                   help=f"Skip handles enriched recently and record results (default path {LEAD_STORE_PATH})")
+    p.add_argument("--metrics", help="Write LLM token/latency/cost counters (Prometheus text) to this file")
+    p.add_argument("--stale-days", type=float, default=30,
+                   help="With --lead-store: re-enrich handles last scraped longer ago than this (default 30)")
+    p.add_argument("--compact", action="store_true",
+                   help="Compact profile fields (caption dedup / noise stripping / token budgets); off by default")
+    p.add_argument("--budget", action="append", default=[], metavar="FIELD=TOKENS",
+                   help=f"Override a token budget, repeatable; implies --compact (fields: {', '.join(TOKEN_BUDGETS)})")
     args = p.parse_args()
 
+    budgets = dict(TOKEN_BUDGETS) if args.compact or args.budget else None
+    for spec in args.budget:
+        field, _, n = spec.partition("=")
+        if field not in TOKEN_BUDGETS or not n.isdigit():
+            p.error(f"invalid --budget {spec!r}")
+        budgets[field] = int(n)
+
     df = score_leads(
         csv_in=args.csv_in,
         csv_out=args.csv_out,
         use_perplexity=not args.no_perp,
         max_handles=args.max,
+        pipelined=args.pipeline,
+        use_cache=args.cache,
+        checkpoint=args.checkpoint,
+        resume=args.resume,
+        mode=args.mode,
+        prefilter=args.prefilter,
+        prefilter_threshold=args.prefilter_threshold,
+        lead_store=args.lead_store,
+        stale_after_days=args.stale_days,
+        metrics_path=args.metrics,
+        token_budgets=budgets,
+        multi_max_profiles=args.multi_max,
+        multi_token_budget=args.multi_tokens,
     )
     pprint.pp(df.head())
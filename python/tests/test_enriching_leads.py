@@ -0,0 +1,35 @@
+import importlib
+import json
+
+import pytest
+
+
+@pytest.fixture
+def el(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)   # the module opens its log file under ./logs on import
+    return importlib.import_module("enriching_leads")
+
+
+def test_batch_mode_records_llm_usage(el, tmp_path, monkeypatch):
+    csv_in = tmp_path / "leads.csv"
+    csv_in.write_text("channelName\nalice\nbob\n", encoding="utf-8")
+    monkeypatch.setattr(el, "_scrape_profiles",
+                        lambda chunk: [{"username": h, "biography": f"bio of {h}"} for h in chunk])
+
+    async def no_online_calls(*args, **kwargs):
+        raise AssertionError("batch answers should cover every profile")
+    monkeypatch.setattr(el, "agpt_chat", no_online_calls)
+
+    def runner(path):
+        lines = path.read_text(encoding="utf-8").splitlines()
+        return {json.loads(line)["custom_id"]: "fits the audience\n##Score 4" for line in lines}
+
+    df = el.score_leads(csv_in=csv_in, use_perplexity=False, mode="batch",
+                        batch_dir=tmp_path / "batches", batch_runner=runner)
+
+    usage = df.attrs["llm_metrics"]
+    assert not usage.empty
+    assert set(usage["stage"]) == {"grade_batch"}
+    assert usage["calls"].sum() == 2
+    assert sorted(df["username"]) == ["alice", "bob"]
+    assert (df["llm_calls"] == 1).all()
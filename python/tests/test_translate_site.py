@@ -0,0 +1,25 @@
+import translate_site as ts
+
+PAGE = "<!DOCTYPE html><html lang=\"en\"><head><title>{title}</title></head><body><p>{body}</p></body></html>"
+
+
+def _fake_batch(self, chunk, source_lang, target_lang):
+    return [f"[{target_lang}] {text}" for text in chunk]
+
+
+def _translate(site, *extra):
+    return ts.main([str(site), "de", "--deepl-api-key", "test", "--no-translation-memory", *extra])
+
+
+def test_incremental_run_adds_page_in_new_directory(tmp_path, monkeypatch):
+    monkeypatch.setattr(ts.DeeplTranslator, "_translate_batch", _fake_batch)
+    (tmp_path / "index.html").write_text(PAGE.format(title="Home", body="Welcome"), encoding="utf-8")
+    _translate(tmp_path, "--incremental")
+
+    (tmp_path / "newsec").mkdir()
+    (tmp_path / "newsec" / "page.html").write_text(PAGE.format(title="New", body="Fresh page"), encoding="utf-8")
+    _translate(tmp_path, "--incremental")
+
+    translated = (tmp_path / "de" / "newsec" / "page.html").read_text(encoding="utf-8")
+    assert "[de] Fresh page" in translated
+    assert (tmp_path / "de" / "index.html").exists()
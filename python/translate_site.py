@@ -3,11 +3,14 @@
 
 The script clones a directory of HTML files into ``<root>/<target-lang>/`` while
 translating textual content through the DeepL API and injecting a language switcher
-overlay in both source and translated pages.
+overlay in both source and translated pages. Markdown posts and JS string tables
+marked with ``// i18n:start`` / ``// i18n:end`` are translated as well (see
+``EXTRACTORS``); every other file is copied as an asset.
 
 Example::
 
     python translate_site.py hosting de --source-lang en
+    python translate_site.py hosting de es fr ja --incremental   # all targets in one pass
 
 Requirements:
     pip install beautifulsoup4 requests python-dotenv
@@ -19,25 +22,45 @@ DeepL authentication:
 Optional overrides:
     Create a JSON file mapping original strings to desired translations and
     pass it with --translation-overrides.
+
+Translation memory:
+    Every DeepL result is stored in .cache/translation_memory.sqlite (see
+    --translation-memory / --no-translation-memory), so later runs only send
+    segments that changed.
 """
 from __future__ import annotations
 
 import argparse
+import contextlib
+import hashlib
+import html as html_lib
 import json
 import os
 import pathlib
 import re
 import shutil
+import sqlite3
 import sys
-from dataclasses import dataclass
-from typing import Dict, Iterator, List, Sequence, Tuple
+import threading
+import urllib.parse
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Sequence, Tuple
 
 from bs4 import BeautifulSoup, Comment, Doctype  # type: ignore
 import requests  # type: ignore
 from dotenv import load_dotenv  # type: ignore
 
+from utils.utils_http import get_session
+from utils.utils_ratelimit import RateLimiter
+
 DEEPL_API_FREE_URL = "https://api-free.deepl.com/v2/translate"
 DEEPL_API_PRO_URL = "https://api.deepl.com/v2/translate"
+DEEPL_RETRY_STATUSES = (429, 500, 502, 503, 504)
+DEEPL_MAX_TEXTS = 50  # per request, API limit
+DEEPL_MAX_REQUEST_BYTES = 120 * 1024  # API limit is 128 KiB; leave room for the other form fields
+DEFAULT_TRANSLATION_MEMORY = ".cache/translation_memory.sqlite"
+MANIFEST_NAME = ".translate-manifest.json"  # dotfile: skipped by Firebase hosting
 
 HTML_EXTENSIONS = {".html", ".htm"}
 ATTRIBUTE_CANDIDATES = (
@@ -98,6 +121,13 @@ load_dotenv()
 
 _WHITESPACE_LEADING = re.compile(r"^\s+")
 _WHITESPACE_TRAILING = re.compile(r"\s+$")
+_WHITESPACE_RUN = re.compile(r"\s+")
+_OVERLAY_STYLE_MARKER = re.compile(rf"""<style\b[^>]*\bid=["']{OVERLAY_STYLE_ID}["']""", re.IGNORECASE)
+_OVERLAY_CONTAINER_MARKER = re.compile(rf"""<div\b[^>]*\bid=["']{OVERLAY_CONTAINER_ID}["'][^>]*>""", re.IGNORECASE)
+_DIV_TAG = re.compile(r"<(/?)div\b[^>]*>", re.IGNORECASE)
+_OVERLAY_STYLE_BLOCK = re.compile(
+    rf"""<style\b[^>]*\bid=["']{OVERLAY_STYLE_ID}["'][^>]*>.*?</style>""", re.IGNORECASE | re.DOTALL
+)
 
 
 @dataclass
@@ -108,32 +138,131 @@ class LanguageEntry:
     active: bool
 
 
+class TranslationMemory:
+    """Persistent segment store shared by every run and language pair.
+
+    Entries are keyed by (source_lang, target_lang, options, normalized text) in a
+    single SQLite file, so re-translating a site only sends segments DeepL has not
+    seen for that language pair and option set.
+    """
+
+    def __init__(self, path: str | os.PathLike[str]) -> None:
+        self.path = pathlib.Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS segments ("
+            " source TEXT NOT NULL, target TEXT NOT NULL, options TEXT NOT NULL,"
+            " text TEXT NOT NULL, translation TEXT NOT NULL,"
+            " PRIMARY KEY (source, target, options, text)) WITHOUT ROWID"
+        )
+
+    def lookup(self, source_lang: str, target_lang: str, options: str, texts: Sequence[str]) -> Dict[str, str]:
+        found: Dict[str, str] = {}
+        with self._lock:
+            for text in texts:
+                row = self._conn.execute(
+                    "SELECT translation FROM segments WHERE source = ? AND target = ? AND options = ? AND text = ?",
+                    (source_lang, target_lang, options, text),
+                ).fetchone()
+                if row is not None:
+                    found[text] = row[0]
+        self.hits += len(found)
+        self.misses += len(texts) - len(found)
+        return found
+
+    def store(self, source_lang: str, target_lang: str, options: str, pairs: Sequence[Tuple[str, str]]) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO segments (source, target, options, text, translation) VALUES (?, ?, ?, ?, ?)",
+                [(source_lang, target_lang, options, text, translation) for text, translation in pairs],
+            )
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
 class DeeplTranslator:
-    def __init__(self, api_key: str, base_url: str | None = None, *, batch_size: int = 25) -> None:
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str | None = None,
+        *,
+        batch_size: int = 25,
+        max_request_bytes: int = DEEPL_MAX_REQUEST_BYTES,
+        session: requests.Session | None = None,
+        concurrency: int = 1,
+        limiter: RateLimiter | None = None,
+        memory: TranslationMemory | None = None,
+        formality: str | None = None,
+    ) -> None:
         self.api_key = api_key
         self.base_url = base_url or DEEPL_API_FREE_URL
         self.batch_size = batch_size
-        self._cache: Dict[str, str] = {}
+        self.max_request_bytes = max_request_bytes
+        self.requests_sent = 0
+        # Shared keep-alive pool; 429/5xx are retried by the adapter (honouring Retry-After).
+        self.session = session or get_session("deepl", status_forcelist=DEEPL_RETRY_STATUSES)
+        self.concurrency = max(1, concurrency)
+        self.limiter = limiter
+        self.memory = memory
+        self.formality = formality
+        self._cache: Dict[Tuple[str, str, str], str] = {}
+        self._cache_lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=self.concurrency) if self.concurrency > 1 else None
+
+    @property
+    def options_key(self) -> str:
+        """Request options that change the output; part of the translation-memory key."""
+        return "&".join(f"{key}={value}" for key, value in self._options())
+
+    def _options(self) -> List[Tuple[str, str]]:
+        options = [("preserve_formatting", "1")]
+        if self.formality:
+            options.append(("formality", self.formality))
+        return options
 
     def translate_many(self, texts: Sequence[str], source_lang: str, target_lang: str) -> List[str]:
-        missing = [t for t in texts if t not in self._cache]
-        for chunk in _chunked(missing, self.batch_size):
-            if not chunk:
-                continue
-            results = self._translate_batch(chunk, source_lang, target_lang)
-            for original, translated in zip(chunk, results):
-                self._cache[original] = translated
-        return [self._cache.get(t, t) for t in texts]
+        source_lang, target_lang = source_lang.lower(), target_lang.lower()
+        keys = [_normalize_segment(t) for t in texts]
+        with self._cache_lock:
+            missing = list(dict.fromkeys(k for k in keys if (source_lang, target_lang, k) not in self._cache))
+        if missing and self.memory:
+            remembered = self.memory.lookup(source_lang, target_lang, self.options_key, missing)
+            with self._cache_lock:
+                for key, translated in remembered.items():
+                    self._cache.setdefault((source_lang, target_lang, key), translated)
+            missing = [k for k in missing if k not in remembered]
+        chunks = [chunk for chunk in _pack_requests(missing, self.batch_size, self.max_request_bytes) if chunk]
+        if self._pool and len(chunks) > 1:
+            batches = self._pool.map(lambda c: self._translate_batch(c, source_lang, target_lang), chunks)
+        else:
+            batches = (self._translate_batch(c, source_lang, target_lang) for c in chunks)
+        for chunk, results in zip(chunks, batches):
+            with self._cache_lock:
+                for original, translated in zip(chunk, results):
+                    self._cache.setdefault((source_lang, target_lang, original), translated)
+            if self.memory:
+                self.memory.store(source_lang, target_lang, self.options_key, list(zip(chunk, results)))
+        with self._cache_lock:
+            return [self._cache.get((source_lang, target_lang, k), t) for k, t in zip(keys, texts)]
 
     def _translate_batch(self, chunk: Sequence[str], source_lang: str, target_lang: str) -> List[str]:
         form: List[Tuple[str, str]] = [
             ("auth_key", self.api_key),
             ("source_lang", source_lang.upper()),
             ("target_lang", target_lang.upper()),
-            ("preserve_formatting", "1"),
+            *self._options(),
         ]
         form.extend(("text", text) for text in chunk)
-        response = self._post(form)
+        with self.limiter.slot() if self.limiter else contextlib.nullcontext():
+            response = self._post(form)
+        self.requests_sent += 1
         if response.status_code == 456:
             raise RuntimeError("DeepL quota exceeded (HTTP 456).")
         if response.status_code >= 400:
@@ -145,14 +274,33 @@ class DeeplTranslator:
         return [item.get("text", "") for item in translations]
 
     def _post(self, form: List[Tuple[str, str]]) -> requests.Response:
-        response = requests.post(self.base_url, data=form, timeout=30)
+        response = self.session.post(self.base_url, data=form, timeout=30)
         if response.status_code == 403 and self.base_url == DEEPL_API_FREE_URL:
             # Likely using a pro key; retry against the pro endpoint once.
             self.base_url = DEEPL_API_PRO_URL
-            response = requests.post(self.base_url, data=form, timeout=30)
+            response = self.session.post(self.base_url, data=form, timeout=30)
         return response
 
 
+@dataclass
+class TargetPlan:
+    """Work for one target language in a run."""
+
+    lang: str
+    root: pathlib.Path
+    incremental: bool
+    config_key: str
+    page_paths: List[pathlib.Path] = field(default_factory=list)
+    asset_paths: List[pathlib.Path] = field(default_factory=list)
+    unchanged_files: int = 0
+    removed_orphans: int = 0
+    translated_segments: int = 0
+
+    @property
+    def manifest_path(self) -> pathlib.Path:
+        return self.root / MANIFEST_NAME
+
+
 def main(argv: Sequence[str] | None = None) -> int:
     args = parse_args(argv)
     root = pathlib.Path(args.site_root).resolve()
@@ -163,14 +311,18 @@ def main(argv: Sequence[str] | None = None) -> int:
     if not api_key:
         raise SystemExit("DeepL API key missing. Use --deepl-api-key or set DEEPL_API_KEY.")
 
-    target_lang = args.target_lang.lower()
+    target_langs = _parse_target_langs(args.target_lang)
     source_lang = args.source_lang.lower()
-
-    target_root = root / target_lang
-    if target_root.exists():
-        if not args.force:
-            raise SystemExit(f"Translation target already exists: {target_root}. Use --force to overwrite.")
-        shutil.rmtree(target_root)
+    if source_lang in target_langs:
+        raise SystemExit(f"Source language {source_lang!r} cannot also be a target.")
+
+    for target_lang in target_langs:
+        target_root = root / target_lang
+        if target_root.exists() and not args.incremental and not args.force:
+            raise SystemExit(
+                f"Translation target already exists: {target_root}. "
+                "Use --force to overwrite or --incremental to update it."
+            )
 
     overrides: Dict[str, str] = {}
     if args.translation_overrides:
@@ -182,37 +334,87 @@ def main(argv: Sequence[str] | None = None) -> int:
 
     existing_lang_dirs = _detect_language_dirs(root)
     skip_lang_dirs = set(existing_lang_dirs)
-    skip_lang_dirs.add(target_lang)
-
-    translator = DeeplTranslator(api_key)
-
-    processed_pages = 0
-    copied_assets = 0
-    translated_segments = 0
+    skip_lang_dirs.update(target_langs)
+
+    # Several targets share one extraction pass, which is the two-phase path.
+    global_batching = args.global_batching or len(target_langs) > 1
+    jobs = max(1, args.jobs)
+    limiter = RateLimiter(rpm=args.deepl_rpm, initial_concurrency=jobs, max_concurrency=jobs) if jobs > 1 else None
+    memory = None if args.no_translation_memory else TranslationMemory(args.translation_memory)
+    translator = DeeplTranslator(
+        api_key,
+        batch_size=DEEPL_MAX_TEXTS if global_batching else 25,
+        concurrency=jobs,
+        limiter=limiter,
+        memory=memory,
+        formality=args.formality,
+    )
 
-    for rel_path in _iter_site_files(root, skip_lang_dirs):
-        src_path = root / rel_path
-        dest_path = target_root / rel_path
-        dest_path.parent.mkdir(parents=True, exist_ok=True)
-
-        if src_path.suffix.lower() in HTML_EXTENSIONS:
-            processed_pages += 1
-            segments = translate_html(
-                src_path=src_path,
-                dest_path=dest_path,
+    source_files: List[pathlib.Path] = list(_iter_site_files(root, skip_lang_dirs))
+    source_digests = {p.as_posix(): _source_digest(root / p) for p in source_files}
+    plans = [
+        _plan_target(
+            root=root,
+            target_lang=target_lang,
+            source_lang=source_lang,
+            source_files=source_files,
+            source_digests=source_digests,
+            translator=translator,
+            overrides=overrides,
+            incremental=args.incremental,
+        )
+        for target_lang in target_langs
+    ]
+
+    for plan in plans:
+        # orphans first: the sweep also drops empty directories, incl. ones made for new pages
+        if plan.incremental:
+            plan.removed_orphans = _remove_orphans(plan.root, {p.as_posix() for p in source_files})
+        for rel_path in plan.asset_paths:
+            dest_path = plan.root / rel_path
+            dest_path.parent.mkdir(parents=True, exist_ok=True)
+            _place_asset(root / rel_path, dest_path, link=args.link_assets)
+        for rel_path in plan.page_paths:
+            (plan.root / rel_path).parent.mkdir(parents=True, exist_ok=True)
+
+    if global_batching:
+        translate_pages_global(
+            root=root,
+            plans=[plan for plan in plans if plan.page_paths],
+            translator=translator,
+            source_lang=source_lang,
+            overrides=overrides,
+            jobs=jobs,
+        )
+    elif jobs > 1:
+        plan = plans[0]
+        plan.translated_segments = translate_pages_parallel(
+            root=root,
+            target_root=plan.root,
+            rel_paths=plan.page_paths,
+            translator=translator,
+            source_lang=source_lang,
+            target_lang=plan.lang,
+            overrides=overrides,
+            jobs=jobs,
+        )
+    else:
+        plan = plans[0]
+        for rel_path in plan.page_paths:
+            segments = translate_page(
+                src_path=root / rel_path,
+                dest_path=plan.root / rel_path,
                 translator=translator,
                 source_lang=source_lang,
-                target_lang=target_lang,
+                target_lang=plan.lang,
                 overrides=overrides,
             )
-            translated_segments += segments
-            print(f"[translate] {rel_path} -> {target_lang}/{rel_path} ({segments} segment(s))")
-        else:
-            copied_assets += 1
-            shutil.copy2(src_path, dest_path)
+            plan.translated_segments += segments
+            print(f"[translate] {rel_path} -> {plan.lang}/{rel_path} ({segments} segment(s))")
 
     if not args.skip_overlay:
-        discovered_langs = existing_lang_dirs | _detect_language_dirs(root) | {target_lang}
+        # One refresh for all targets; running per language used to redo every language each time.
+        discovered_langs = existing_lang_dirs | _detect_language_dirs(root) | set(target_langs)
         languages = [source_lang]
         for lang in sorted(discovered_langs - {source_lang}):
             languages.append(lang)
@@ -231,13 +433,73 @@ def main(argv: Sequence[str] | None = None) -> int:
             update_source=not args.skip_source_overlay,
         )
 
-    print(
-        f"Translated {processed_pages} HTML file(s) ({translated_segments} total segment(s)). "
-        f"Copied {copied_assets} asset(s) to {target_root}."
-    )
+    for plan in plans:
+        _write_manifest(plan.manifest_path, config=plan.config_key, files=source_digests)
+        print(
+            f"Translated {len(plan.page_paths)} page(s) ({plan.translated_segments} total segment(s)). "
+            f"Copied {len(plan.asset_paths)} asset(s) to {plan.root}."
+        )
+        if plan.incremental:
+            print(
+                f"Incremental: {plan.unchanged_files} unchanged file(s) skipped, "
+                f"{plan.removed_orphans} orphan(s) removed."
+            )
+    print(f"DeepL requests: {translator.requests_sent}.")
+    if memory:
+        print(f"Translation memory {memory.path}: {memory.hits} hit(s), {memory.misses} miss(es) sent to DeepL.")
+        memory.close()
     return 0
 
 
+def _parse_target_langs(values: Sequence[str]) -> List[str]:
+    """Accept `de fr` as well as `de,fr`; keep order, drop duplicates."""
+    langs = [part.strip().lower() for value in values for part in value.split(",") if part.strip()]
+    return list(dict.fromkeys(langs))
+
+
+def _plan_target(
+    *,
+    root: pathlib.Path,
+    target_lang: str,
+    source_lang: str,
+    source_files: Sequence[pathlib.Path],
+    source_digests: Dict[str, str],
+    translator: DeeplTranslator,
+    overrides: Dict[str, str],
+    incremental: bool,
+) -> TargetPlan:
+    target_root = root / target_lang
+    incremental = incremental and target_root.exists()
+    if target_root.exists() and not incremental:
+        shutil.rmtree(target_root)
+
+    plan = TargetPlan(
+        lang=target_lang,
+        root=target_root,
+        incremental=incremental,
+        config_key=_config_digest(source_lang, target_lang, translator.options_key, overrides),
+    )
+    previous = _load_manifest(plan.manifest_path) if incremental else {}
+    previous_files: Dict[str, str] = previous.get("files", {})
+    config_changed = previous.get("config") != plan.config_key
+
+    for rel_path in source_files:
+        src_path = root / rel_path
+        is_page = _extractor_for(src_path) is not None
+        if (
+            incremental
+            and (target_root / rel_path).exists()
+            and previous_files.get(rel_path.as_posix()) == source_digests[rel_path.as_posix()]
+            and not (is_page and config_changed)
+        ):
+            plan.unchanged_files += 1
+        elif is_page:
+            plan.page_paths.append(rel_path)
+        else:
+            plan.asset_paths.append(rel_path)
+    return plan
+
+
 def translate_html(
     *,
     src_path: pathlib.Path,
@@ -252,15 +514,107 @@ def translate_html(
     soup = BeautifulSoup(original_text, "html.parser")
 
     segment_count = apply_translation(soup, translator, source_lang, target_lang, overrides)
+    _set_document_lang(soup, target_lang)
+
+    translated_html = str(soup)
+
+    dest_path.write_text(translated_html, encoding="utf-8")
+    return segment_count
+
+
+def _set_document_lang(soup: BeautifulSoup, target_lang: str) -> None:
     if soup.html and soup.html.has_attr("lang"):
         soup.html["lang"] = target_lang
     elif soup.html:
         soup.html.attrs["lang"] = target_lang
 
-    translated_html = str(soup)
 
-    dest_path.write_text(translated_html, encoding="utf-8")
-    return segment_count
+def translate_pages_parallel(
+    *,
+    root: pathlib.Path,
+    target_root: pathlib.Path,
+    rel_paths: Sequence[pathlib.Path],
+    translator: DeeplTranslator,
+    source_lang: str,
+    target_lang: str,
+    overrides: Dict[str, str],
+    jobs: int,
+) -> int:
+    """
+    Concurrent variant of the per-page loop in `main`: parsing and rendering run in
+    a process pool, and up to `jobs` pages wait on DeepL at the same time (the
+    translator applies the shared rate limit). Output is identical to serial mode.
+    """
+    total_segments = 0
+    with ProcessPoolExecutor(max_workers=jobs) as procs, ThreadPoolExecutor(max_workers=jobs) as pages:
+
+        def _one(rel_path: pathlib.Path) -> int:
+            src_path = root / rel_path
+            dest_path = target_root / rel_path
+            texts = procs.submit(extract_page_texts, src_path).result()
+            translated = translator.translate_many(texts, source_lang, target_lang)
+            mapping = dict(zip(texts, translated))
+            segments = procs.submit(render_page, src_path, dest_path, mapping, target_lang, overrides).result()
+            print(f"[translate] {rel_path} -> {target_lang}/{rel_path} ({segments} segment(s))")
+            return segments
+
+        for segments in pages.map(_one, rel_paths):
+            total_segments += segments
+    return total_segments
+
+
+def translate_pages_global(
+    *,
+    root: pathlib.Path,
+    plans: Sequence[TargetPlan],
+    translator: DeeplTranslator,
+    source_lang: str,
+    overrides: Dict[str, str],
+    jobs: int,
+) -> None:
+    """
+    Two-phase variant: extract the segments of every page once, translate the
+    site-wide de-duplicated set for every target language concurrently (requests
+    packed to the DeepL limits), then render every (language, page) pair.
+    Shared navigation/footer/game strings are sent once per language.
+    """
+    if not plans:
+        return
+    with contextlib.ExitStack() as stack:
+        procs = stack.enter_context(ProcessPoolExecutor(max_workers=jobs)) if jobs > 1 else None
+        mapper = procs.map if procs else map
+
+        pages = sorted({rel_path for plan in plans for rel_path in plan.page_paths})
+        page_texts = dict(zip(pages, mapper(extract_page_texts, [root / rel_path for rel_path in pages])))
+
+        def _translate_target(plan: TargetPlan) -> Dict[str, str]:
+            all_texts = [text for rel_path in plan.page_paths for text in page_texts[rel_path]]
+            unique = list(dict.fromkeys(all_texts))
+            requests_before = translator.requests_sent
+            translated = dict(zip(unique, translator.translate_many(unique, source_lang, plan.lang)))
+            print(
+                f"[global] {plan.lang}: {len(all_texts)} segment(s) on {len(plan.page_paths)} page(s), "
+                f"{len(unique)} unique, ~{translator.requests_sent - requests_before} DeepL request(s)"
+            )
+            return translated
+
+        with ThreadPoolExecutor(max_workers=len(plans)) as fan_out:
+            translated_by_lang = dict(zip((plan.lang for plan in plans), fan_out.map(_translate_target, plans)))
+
+        jobs_list = [(plan, rel_path) for plan in plans for rel_path in plan.page_paths]
+        counts = list(
+            mapper(
+                render_page,
+                [root / rel_path for _, rel_path in jobs_list],
+                [plan.root / rel_path for plan, rel_path in jobs_list],
+                [{t: translated_by_lang[plan.lang][t] for t in page_texts[rel_path]} for plan, rel_path in jobs_list],
+                [plan.lang for plan, _ in jobs_list],
+                [overrides] * len(jobs_list),
+            )
+        )
+    for (plan, rel_path), segments in zip(jobs_list, counts):
+        plan.translated_segments += segments
+        print(f"[translate] {rel_path} -> {plan.lang}/{rel_path} ({segments} segment(s))")
 
 
 def ensure_overlay(
@@ -268,7 +622,12 @@ def ensure_overlay(
     html: str,
     entries: Sequence[LanguageEntry],
     replace_existing: bool,
+    fast: bool = True,
 ) -> str:
+    if fast:
+        updated = _inject_overlay_fast(html, entries, replace_existing)
+        if updated is not None:
+            return updated
     soup = BeautifulSoup(html, "html.parser")
 
     existing = soup.find(id=OVERLAY_CONTAINER_ID)
@@ -305,6 +664,44 @@ def ensure_overlay(
     return str(soup)
 
 
+def _inject_overlay_fast(html: str, entries: Sequence[LanguageEntry], replace_existing: bool) -> str | None:
+    """Swap the existing switcher block in place, leaving every other byte untouched.
+
+    Returns None when the style/container markers are missing or the container's
+    divs do not balance, so the caller can fall back to the full parse.
+    """
+    if not _OVERLAY_STYLE_MARKER.search(html):
+        return None
+    opening = _OVERLAY_CONTAINER_MARKER.search(html)
+    if not opening:
+        return None
+    if not replace_existing:
+        return html
+    depth = 1
+    for tag in _DIV_TAG.finditer(html, opening.end()):
+        depth += -1 if tag.group(1) else 1
+        if depth == 0:
+            return html[: opening.start()] + _render_overlay(entries) + html[tag.end() :]
+    return None
+
+
+def _render_overlay(entries: Sequence[LanguageEntry]) -> str:
+    """Serialize the switcher exactly as BeautifulSoup does in the full-parse path."""
+    links = []
+    for entry in entries:
+        current = ' aria-current="true"' if entry.active else ""
+        css_class = "active" if entry.active else ""
+        links.append(
+            f'<a{current} class="{css_class}" href="{html_lib.escape(entry.href)}">'
+            f"{html_lib.escape(entry.label, quote=False)}</a>"
+        )
+    return (
+        f'<div class="language-switcher" data-no-translate="true" id="{OVERLAY_CONTAINER_ID}">'
+        + "".join(links)
+        + "</div>"
+    )
+
+
 def _build_lang_link(soup: BeautifulSoup, *, label: str, href: str, active: bool) -> BeautifulSoup:
     tag = soup.new_tag("a")
     tag.string = label
@@ -322,9 +719,18 @@ def apply_translation(
     target_lang: str,
     overrides: Dict[str, str],
 ) -> int:
-    text_nodes: List[Tuple[BeautifulSoup, str]] = []
-    texts: List[str] = []
+    text_nodes, attr_targets = collect_segments(soup)
+    texts = _segment_texts(text_nodes, attr_targets)
+    translations = translator.translate_many(texts, source_lang, target_lang)
+    _write_back(text_nodes, attr_targets, translations, overrides)
+    return len(texts)
 
+
+def collect_segments(
+    soup: BeautifulSoup,
+) -> Tuple[List[Tuple[BeautifulSoup, str]], List[Tuple[BeautifulSoup, str, str]]]:
+    """Find translatable text nodes and attribute values, in document order."""
+    text_nodes: List[Tuple[BeautifulSoup, str]] = []
     for node in soup.find_all(string=True):
         if isinstance(node, (Comment, Doctype)):
             continue
@@ -336,7 +742,6 @@ def apply_translation(
         text = str(node)
         if text.strip():
             text_nodes.append((node, text))
-            texts.append(text)
 
     attr_targets: List[Tuple[BeautifulSoup, str, str]] = []
     for element in soup.find_all(True):
@@ -347,10 +752,22 @@ def apply_translation(
             if element.has_attr("data-no-translate") or element.find_parent(attrs={"data-no-translate": True}):
                 continue
             attr_targets.append((element, attr, value))
-            texts.append(value)
+    return text_nodes, attr_targets
+
+
+def _segment_texts(
+    text_nodes: Sequence[Tuple[BeautifulSoup, str]],
+    attr_targets: Sequence[Tuple[BeautifulSoup, str, str]],
+) -> List[str]:
+    return [text for _, text in text_nodes] + [value for _, _, value in attr_targets]
 
-    translations = translator.translate_many(texts, source_lang, target_lang)
 
+def _write_back(
+    text_nodes: Sequence[Tuple[BeautifulSoup, str]],
+    attr_targets: Sequence[Tuple[BeautifulSoup, str, str]],
+    translations: Sequence[str],
+    overrides: Dict[str, str],
+) -> None:
     text_idx = 0
     for node, original in text_nodes:
         translated = _maybe_override(original, translations[text_idx], overrides)
@@ -362,7 +779,255 @@ def apply_translation(
         text_idx += 1
         element[attr] = _rewrap_whitespace(original, translated)
 
-    return len(texts)
+
+def extract_page_texts(src_path: pathlib.Path) -> List[str]:
+    """Process-pool worker: read one page and return its segments in document order."""
+    extractor = EXTRACTORS[src_path.suffix.lower()]
+    return extractor.extract(src_path.read_text(encoding="utf-8"))
+
+
+def render_page(
+    src_path: pathlib.Path,
+    dest_path: pathlib.Path,
+    translations: Dict[str, str],
+    target_lang: str,
+    overrides: Dict[str, str],
+) -> int:
+    """Process-pool worker: re-read one page, substitute `translations` and write it."""
+    extractor = EXTRACTORS[src_path.suffix.lower()]
+    rendered, count = extractor.render(src_path.read_text(encoding="utf-8"), translations, target_lang, overrides)
+    dest_path.write_text(rendered, encoding="utf-8")
+    return count
+
+
+def translate_page(
+    *,
+    src_path: pathlib.Path,
+    dest_path: pathlib.Path,
+    translator: DeeplTranslator,
+    source_lang: str,
+    target_lang: str,
+    overrides: Dict[str, str],
+) -> int:
+    """Serial path for one translatable file of any registered type."""
+    if src_path.suffix.lower() in HTML_EXTENSIONS:
+        return translate_html(
+            src_path=src_path,
+            dest_path=dest_path,
+            translator=translator,
+            source_lang=source_lang,
+            target_lang=target_lang,
+            overrides=overrides,
+        )
+    texts = extract_page_texts(src_path)
+    translations = dict(zip(texts, translator.translate_many(texts, source_lang, target_lang)))
+    return render_page(src_path, dest_path, translations, target_lang, overrides)
+
+
+# ----------------------------------------------------------------------------
+# Extractors: one per file type, all feeding the same DeeplTranslator batches.
+# ----------------------------------------------------------------------------
+
+
+@dataclass(frozen=True)
+class Extractor:
+    """Splits one file type into translatable segments and writes translations back.
+
+    ``extract(text)`` returns the segments in order; ``render(text, translations,
+    target_lang, overrides)`` returns the translated file and its segment count.
+    ``claims(text)`` lets a type opt out per file (e.g. JS without markers is
+    copied verbatim as an asset).
+    """
+
+    extract: Callable[[str], List[str]]
+    render: Callable[[str, Dict[str, str], str, Dict[str, str]], Tuple[str, int]]
+    claims: Callable[[str], bool] = lambda text: True
+
+
+EXTRACTORS: Dict[str, Extractor] = {}
+
+
+def register_extractor(suffixes: Sequence[str], extractor: Extractor) -> None:
+    for suffix in suffixes:
+        EXTRACTORS[suffix.lower()] = extractor
+
+
+def _extractor_for(path: pathlib.Path) -> Extractor | None:
+    extractor = EXTRACTORS.get(path.suffix.lower())
+    if extractor is None or not extractor.claims(path.read_text(encoding="utf-8")):
+        return None
+    return extractor
+
+
+def _html_extract(text: str) -> List[str]:
+    return _segment_texts(*collect_segments(BeautifulSoup(text, "html.parser")))
+
+
+def _html_render(text: str, translations: Dict[str, str], target_lang: str, overrides: Dict[str, str]) -> Tuple[str, int]:
+    soup = BeautifulSoup(text, "html.parser")
+    text_nodes, attr_targets = collect_segments(soup)
+    texts = _segment_texts(text_nodes, attr_targets)
+    _write_back(text_nodes, attr_targets, [translations.get(t, t) for t in texts], overrides)
+    _set_document_lang(soup, target_lang)
+    return str(soup), len(texts)
+
+
+def _translate_spans(
+    text: str,
+    spans: Sequence[Tuple[int, int, str]],
+    translations: Dict[str, str],
+    overrides: Dict[str, str],
+    encode: Callable[[str, str], str],
+) -> str:
+    """Replace each (start, end, segment) span of `text`, right to left so offsets stay valid."""
+    parts: List[str] = []
+    cursor = len(text)
+    for start, end, segment in reversed(spans):
+        translated = _maybe_override(segment, translations.get(segment, segment), overrides)
+        parts.append(text[end:cursor])
+        parts.append(encode(text[start:end], _rewrap_whitespace(segment, translated)))
+        cursor = start
+    parts.append(text[:cursor])
+    return "".join(reversed(parts))
+
+
+# Markdown: YAML front matter (only the keys below), the `*Key: value*` header
+# lines blog-loader.js parses, fenced code, HTML lines and rules stay verbatim.
+# Within a line, inline code, link targets and bare URLs are never sent: the line
+# is split into the prose pieces around them.
+MARKDOWN_FRONT_MATTER_KEYS = ("title", "description", "summary", "excerpt")
+_MD_FENCE = re.compile(r"^\s*(```|~~~)")
+_MD_RULE = re.compile(r"^\s*([-*_])(\s*\1){2,}\s*$")
+_MD_HEADER_META = re.compile(r"^\*[A-Z][\w ]*:.*\*\s*$")
+_MD_FRONT_MATTER_VALUE = re.compile(r"^(\w+):\s*(['\"]?)(.*?)\2\s*$")
+_MD_LINE = re.compile(r"^(\s*(?:#{1,6}\s+|>\s*|[-*+]\s+(?:\[[ xX]\]\s+)?|\d+[.)]\s+)*)(.*?)\s*$")
+_MD_LIST_ITEM = re.compile(r"^\s*(?:[-*+]|\d+[.)])\s")
+_HAS_LETTER = re.compile(r"[^\W\d_]")
+_MD_PROTECTED = re.compile(
+    r"(`+).+?\1"                         # inline code
+    r"|\]\([^)]*\)"                      # link / image target
+    r"|<(?:https?|mailto):[^>\s]+>"       # autolink
+    r"|https?://[^\s)>\]]+"               # bare URL
+)
+
+
+def _prose_pieces(start: int, segment: str) -> Iterator[Tuple[int, int, str]]:
+    """Split one line segment around `_MD_PROTECTED` parts; yield the pieces that contain letters."""
+    cursor = 0
+    for match in [*_MD_PROTECTED.finditer(segment), None]:
+        end = match.start() if match else len(segment)
+        piece = segment[cursor:end]
+        if _HAS_LETTER.search(piece):
+            yield start + cursor, start + end, piece
+        if match:
+            cursor = match.end()
+
+
+def _markdown_spans(text: str) -> List[Tuple[int, int, str]]:
+    spans: List[Tuple[int, int, str]] = []
+    lines = text.splitlines(keepends=True)
+    offset = 0
+    in_fence = None
+    in_front_matter = bool(lines) and lines[0].strip() == "---"
+    in_header = not in_front_matter
+    for idx, line in enumerate(lines):
+        start, offset = offset, offset + len(line)
+        stripped = line.strip()
+        if in_front_matter:
+            if idx and stripped == "---":
+                in_front_matter = False
+                in_header = True
+                continue
+            match = _MD_FRONT_MATTER_VALUE.match(line.rstrip("\r\n"))
+            if idx and match and match.group(1).lower() in MARKDOWN_FRONT_MATTER_KEYS and match.group(3):
+                spans.append((start + match.start(3), start + match.end(3), match.group(3)))
+            continue
+        fence = _MD_FENCE.match(line)
+        if fence:
+            in_fence = None if in_fence == fence.group(1) else in_fence or fence.group(1)
+            continue
+        if in_fence or not stripped or stripped.startswith("<"):
+            continue
+        if line.startswith(("    ", "\t")) and not _MD_LIST_ITEM.match(line):
+            continue  # indented code block
+        if _MD_RULE.match(line):
+            in_header = False
+            continue
+        if in_header and _MD_HEADER_META.match(stripped):
+            continue
+        match = _MD_LINE.match(line.rstrip("\r\n"))
+        if match and _HAS_LETTER.search(match.group(2)):
+            spans.extend(_prose_pieces(start + match.start(2), match.group(2)))
+    return spans
+
+
+def _markdown_extract(text: str) -> List[str]:
+    return [segment for _, _, segment in _markdown_spans(text)]
+
+
+def _markdown_render(text: str, translations: Dict[str, str], target_lang: str, overrides: Dict[str, str]) -> Tuple[str, int]:
+    spans = _markdown_spans(text)
+    return _translate_spans(text, spans, translations, overrides, lambda _, translated: translated), len(spans)
+
+
+# JS: only string values of the JS_I18N_KEYS properties between `// i18n:start`
+# and `// i18n:end` comments are translated (names, tags, slugs, dates and URLs
+# stay as they are). Files without markers are assets.
+JS_I18N_START = "i18n:start"
+JS_I18N_END = "i18n:end"
+JS_I18N_KEYS = ("title", "excerpt", "description", "readTime")
+_JS_REGION = re.compile(rf"(?://|/\*)\s*{JS_I18N_START}.*?(?://|/\*)\s*{JS_I18N_END}", re.DOTALL)
+_JS_PROPERTY = re.compile(r"""(?<![\w$])(['"]?)(\w+)\1\s*:\s*(['"])((?:\\.|(?!\3)[^\\\n])*)\3""")
+_JS_ESCAPE = re.compile(r"\\(u\{[0-9a-fA-F]+\}|u[0-9a-fA-F]{4}|x[0-9a-fA-F]{2}|.)")
+_JS_ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "b": "\b", "f": "\f", "v": "\v", "0": "\0"}
+
+
+def _js_decode(body: str) -> str:
+    def _char(match: re.Match[str]) -> str:
+        esc = match.group(1)
+        if esc[0] in "ux" and len(esc) > 1:
+            return chr(int(esc[1:].strip("{}"), 16))
+        return _JS_ESCAPES.get(esc, esc)
+
+    decoded = _JS_ESCAPE.sub(_char, body)
+    # `\ud83d\ude00` decodes to two surrogates; join them into one code point
+    return decoded.encode("utf-16", "surrogatepass").decode("utf-16")
+
+
+def _js_encode(literal: str, value: str) -> str:
+    quote = literal[0]
+    escaped = value.replace("\\", "\\\\").replace(quote, "\\" + quote).replace("\n", "\\n")
+    return f"{quote}{escaped}{quote}"
+
+
+def _js_spans(text: str) -> List[Tuple[int, int, str]]:
+    spans: List[Tuple[int, int, str]] = []
+    for region in _JS_REGION.finditer(text):
+        for prop in _JS_PROPERTY.finditer(text, region.start(), region.end()):
+            value = _js_decode(prop.group(4))
+            if prop.group(2) not in JS_I18N_KEYS or not _HAS_LETTER.search(value):
+                continue
+            spans.append((prop.start(3), prop.end(4) + 1, value))
+    return spans
+
+
+def _js_extract(text: str) -> List[str]:
+    return [segment for _, _, segment in _js_spans(text)]
+
+
+def _js_render(text: str, translations: Dict[str, str], target_lang: str, overrides: Dict[str, str]) -> Tuple[str, int]:
+    spans = _js_spans(text)
+    return _translate_spans(text, spans, translations, overrides, _js_encode), len(spans)
+
+
+register_extractor(sorted(HTML_EXTENSIONS), Extractor(extract=_html_extract, render=_html_render))
+register_extractor((".md", ".markdown"), Extractor(extract=_markdown_extract, render=_markdown_render))
+register_extractor((".js", ".mjs"), Extractor(extract=_js_extract, render=_js_render, claims=lambda text: JS_I18N_START in text))
+
+
+def _normalize_segment(text: str) -> str:
+    # Browsers render any whitespace run as one space; leading/trailing runs are restored by _rewrap_whitespace.
+    return _WHITESPACE_RUN.sub(" ", text).strip()
 
 
 def _rewrap_whitespace(original: str, translated: str) -> str:
@@ -426,6 +1091,21 @@ def _chunked(seq: Sequence[str], size: int) -> Iterator[List[str]]:
         yield list(seq[idx : idx + size])
 
 
+def _pack_requests(texts: Sequence[str], max_texts: int, max_bytes: int) -> Iterator[List[str]]:
+    """Greedily fill requests up to `max_texts` texts and `max_bytes` of form-encoded payload."""
+    chunk: List[str] = []
+    size = 0
+    for text in texts:
+        text_bytes = len("&text=") + len(urllib.parse.quote_plus(text))
+        if chunk and (len(chunk) >= max_texts or size + text_bytes > max_bytes):
+            yield chunk
+            chunk, size = [], 0
+        chunk.append(text)
+        size += text_bytes
+    if chunk:
+        yield chunk
+
+
 def _maybe_override(original: str, translated: str, overrides: Dict[str, str]) -> str:
     if not overrides:
         return translated
@@ -446,6 +1126,94 @@ def _load_overrides(path: pathlib.Path) -> Dict[str, str]:
     return cleaned
 
 
+def _file_digest(path: pathlib.Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _source_digest(path: pathlib.Path) -> str:
+    """Digest of a source file that ignores the language switcher.
+
+    Adding a target language rewrites the switcher in every source page; that must
+    not make the next incremental run treat those pages as changed.
+    """
+    if path.suffix.lower() not in {".html", ".htm"}:
+        return _file_digest(path)
+    html = path.read_text(encoding="utf-8", errors="surrogateescape")
+    return hashlib.sha256(_strip_overlay(html).encode("utf-8", errors="surrogateescape")).hexdigest()
+
+
+def _strip_overlay(html: str) -> str:
+    """Remove the switcher style block and container (if present) from `html`."""
+    html = _OVERLAY_STYLE_BLOCK.sub("", html)
+    opening = _OVERLAY_CONTAINER_MARKER.search(html)
+    if not opening:
+        return html
+    depth = 1
+    for tag in _DIV_TAG.finditer(html, opening.end()):
+        depth += -1 if tag.group(1) else 1
+        if depth == 0:
+            return html[: opening.start()] + html[tag.end() :]
+    return html
+
+
+def _config_digest(source_lang: str, target_lang: str, options: str, overrides: Dict[str, str]) -> str:
+    """Anything besides the source bytes that changes translated HTML output."""
+    payload = json.dumps([source_lang, target_lang, options, overrides], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _load_manifest(path: pathlib.Path) -> Dict[str, object]:
+    if not path.exists():
+        return {}
+    try:
+        with path.open("r", encoding="utf-8") as fh:
+            data = json.load(fh)
+    except (OSError, json.JSONDecodeError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def _write_manifest(path: pathlib.Path, *, config: str, files: Dict[str, str]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    with tmp_path.open("w", encoding="utf-8") as fh:
+        json.dump({"version": 1, "config": config, "files": files}, fh, indent=1, sort_keys=True)
+    tmp_path.replace(path)
+
+
+def _place_asset(src_path: pathlib.Path, dest_path: pathlib.Path, *, link: bool) -> None:
+    if link:
+        try:
+            if dest_path.exists():
+                dest_path.unlink()
+            os.link(src_path, dest_path)
+            return
+        except OSError:
+            pass  # cross-device or unsupported filesystem; fall back to a copy
+    shutil.copy2(src_path, dest_path)
+
+
+def _remove_orphans(target_root: pathlib.Path, expected: set[str]) -> int:
+    """Delete files under `target_root` whose source no longer exists."""
+    removed = 0
+    for path in sorted(target_root.rglob("*"), reverse=True):
+        if path.is_dir():
+            if not any(path.iterdir()):
+                path.rmdir()
+            continue
+        rel = path.relative_to(target_root).as_posix()
+        if rel == MANIFEST_NAME or rel in expected:
+            continue
+        path.unlink()
+        removed += 1
+        print(f"[remove] {target_root.name}/{rel}")
+    return removed
+
+
 def _detect_language_dirs(root: pathlib.Path) -> set[str]:
     lang_pattern = re.compile(r"^[a-z]{2,3}(?:-[a-z]{2,3})?$", re.IGNORECASE)
     langs: set[str] = set()
@@ -500,14 +1268,60 @@ def refresh_language_overlays(
 
 
 def parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
-    parser = argparse.ArgumentParser(description="Translate a directory of HTML files via DeepL.")
+    parser = argparse.ArgumentParser(description="Translate a static site (HTML, Markdown, marked JS) via DeepL.")
     parser.add_argument("site_root", help="Root directory of the static site (e.g. hosting)")
-    parser.add_argument("target_lang", help="Target language code (e.g. de, fr, es)")
+    parser.add_argument(
+        "target_lang",
+        nargs="+",
+        help="Target language code(s) (e.g. de, or de fr es ja / de,fr,es,ja for one pass)",
+    )
     parser.add_argument("--source-lang", default="en", help="Source language code (default: en)")
     parser.add_argument("--deepl-api-key", dest="deepl_api_key", help="DeepL auth key (overrides env)")
     parser.add_argument("--force", action="store_true", help="Overwrite existing <root>/<target>/ directory if present")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Update an existing <root>/<target>/ in place: only changed files are re-translated/copied, orphans removed",
+    )
+    parser.add_argument(
+        "--link-assets",
+        action="store_true",
+        help="Hard-link non-HTML assets instead of copying them (falls back to copy)",
+    )
     parser.add_argument("--skip-overlay", action="store_true", help="Do not inject language switcher overlay into translated pages")
     parser.add_argument("--skip-source-overlay", action="store_true", help="Do not modify source files to add overlay")
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Translate N pages concurrently (process pool for parsing, parallel DeepL batches)",
+    )
+    parser.add_argument(
+        "--global-batching",
+        action="store_true",
+        help="Extract all pages first, de-duplicate segments site-wide and send them in maximally packed DeepL requests",
+    )
+    parser.add_argument(
+        "--deepl-rpm",
+        type=int,
+        default=0,
+        help="Shared DeepL requests-per-minute cap for --jobs > 1 (default: unlimited)",
+    )
+    parser.add_argument(
+        "--formality",
+        choices=("default", "more", "less", "prefer_more", "prefer_less"),
+        help="DeepL formality option (only for target languages that support it)",
+    )
+    parser.add_argument(
+        "--translation-memory",
+        default=DEFAULT_TRANSLATION_MEMORY,
+        help=f"Persistent translation memory shared across runs (default: {DEFAULT_TRANSLATION_MEMORY})",
+    )
+    parser.add_argument(
+        "--no-translation-memory",
+        action="store_true",
+        help="Do not read or write the persistent translation memory",
+    )
     parser.add_argument(
         "--translation-overrides",
         help="Path to JSON file with {original: desired translation} entries",
@@ -0,0 +1,121 @@
+"""
+Persistent, content-addressed response cache for LLM API calls (SQLite backed)
+"""
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from pathlib import Path
+
+DEFAULT_CACHE_PATH = os.environ.get("LLM_CACHE_PATH", ".cache/llm_cache.sqlite")
+DEFAULT_TTL_SECS = 30 * 24 * 3600          # a month; prompts change faster than that
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024      # evict least-recently-used beyond this
+
+
+def cache_key(**request) -> str:
+    """Hash of everything that determines the response (model, temperature, max_tokens, messages …)."""
+    blob = json.dumps(request, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """
+    Thread-safe on-disk key → response store.
+
+    Entries older than `ttl_secs` count as misses; once the stored payload exceeds
+    `max_bytes` the least-recently-used entries are dropped.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, *, ttl_secs=DEFAULT_TTL_SECS, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl_secs = ttl_secs
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " created REAL NOT NULL,"
+            " accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses(accessed)")
+        self._bytes = self._stored_bytes()   # running total, so `set` needs no full-table SUM
+
+    def _stored_bytes(self):
+        return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, created, size FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or (self.ttl_secs and now - row[1] > self.ttl_secs):
+                if row is not None:
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._bytes -= row[2]
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return row[0]
+
+    def set(self, key, value):
+        now = time.time()
+        size = len(value.encode("utf-8"))
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, now, now),
+            )
+            self._bytes += size - (old[0] if old else 0)
+            self._evict()
+
+    def _evict(self):
+        if not self.max_bytes:
+            return
+        if self._bytes <= self.max_bytes:
+            return
+        self._bytes = self._stored_bytes()   # resync (other processes may share the file) only when over
+        if self._bytes <= self.max_bytes:
+            return
+        excess = self._bytes - self.max_bytes
+        doomed, freed = [], 0
+        for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY accessed"):
+            doomed.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", doomed)
+        self._bytes -= freed
+
+    def purge_expired(self):
+        if not self.ttl_secs:
+            return 0
+        with self._lock:
+            cur = self._conn.execute("DELETE FROM responses WHERE created < ?", (time.time() - self.ttl_secs,))
+            self._bytes = self._stored_bytes()
+            return cur.rowcount
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses}
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_cache():
+    """Process-wide cache at LLM_CACHE_PATH, opened lazily on first use."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = LLMCache()
+        return _default_cache
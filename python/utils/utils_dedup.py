@@ -0,0 +1,116 @@
+"""
+Memory-bounded "have I seen this key?" structures for streaming dedup, plus
+MinHash signatures for near-duplicate text (search terms)
+"""
+import re
+import math
+import random
+import sqlite3
+import hashlib
+import unicodedata
+import tempfile
+from pathlib import Path
+
+
+class BloomFilter:
+    """Plain bit-array Bloom filter sized for `capacity` items at `error_rate` false positives."""
+
+    def __init__(self, capacity=10_000_000, error_rate=0.01):
+        self.n_bits = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.n_hashes = max(1, round(self.n_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.n_bits + 7) // 8)
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.n_bits for i in range(self.n_hashes)]   # double hashing
+
+    def add(self, key):
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+class SeenSet:
+    """
+    Exact set with flat memory: a Bloom filter answers "definitely new" in RAM,
+    and only its "maybe seen" answers are confirmed against an on-disk SQLite set.
+    """
+
+    def __init__(self, path=None, *, capacity=10_000_000, error_rate=0.01, commit_every=10_000):
+        if path is None:
+            self._tmp = tempfile.TemporaryDirectory(prefix="seenset_")
+            path = Path(self._tmp.name) / "seen.sqlite"
+        self.bloom = BloomFilter(capacity, error_rate)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)   # fed from worker threads
+        self._conn.execute("PRAGMA journal_mode=OFF")
+        self._conn.execute("PRAGMA synchronous=OFF")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS seen (key TEXT PRIMARY KEY) WITHOUT ROWID")
+        for (key,) in self._conn.execute("SELECT key FROM seen"):
+            self.bloom.add(key)
+        self._commit_every = commit_every
+        self._pending = 0
+        self.size = 0
+
+    def add(self, key):
+        """Add `key`; return True if it was new."""
+        if key in self.bloom:
+            if self._conn.execute("SELECT 1 FROM seen WHERE key = ?", (key,)).fetchone():
+                return False
+        self.bloom.add(key)
+        self._conn.execute("INSERT OR IGNORE INTO seen (key) VALUES (?)", (key,))
+        self.size += 1
+        self._pending += 1
+        if self._pending >= self._commit_every:
+            self._conn.commit()
+            self._pending = 0
+        return True
+
+    def __contains__(self, key):
+        return key in self.bloom and bool(
+            self._conn.execute("SELECT 1 FROM seen WHERE key = ?", (key,)).fetchone()
+        )
+
+    def close(self):
+        self._conn.commit()
+        self._conn.close()
+        if getattr(self, "_tmp", None):
+            self._tmp.cleanup()
+
+
+_MERSENNE = (1 << 61) - 1
+
+
+def normalize_text(text):
+    """Lower-case, strip accents and punctuation, collapse whitespace."""
+    text = unicodedata.normalize("NFKD", str(text)).encode("ascii", "ignore").decode("ascii")
+    return " ".join(re.sub(r"[^\w\s]", " ", text.lower()).split())
+
+
+def shingles(text, k=3):
+    """Character k-grams of every word of `normalize_text(text)`, so word order and plurals barely matter."""
+    out = set()
+    for word in normalize_text(text).split():
+        padded = f" {word} "
+        out.update(padded[i:i + k] for i in range(max(1, len(padded) - k + 1)))
+    return out
+
+
+class MinHasher:
+    """MinHash signatures whose agreement estimates the Jaccard similarity of two shingle sets."""
+
+    def __init__(self, num_perm=64, seed=1):
+        rng = random.Random(seed)
+        self.params = [(rng.randrange(1, _MERSENNE), rng.randrange(0, _MERSENNE)) for _ in range(num_perm)]
+
+    def signature(self, text):
+        hashes = [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little")
+                  for s in shingles(text)] or [0]
+        return [min((a * h + b) % _MERSENNE for h in hashes) for a, b in self.params]
+
+    @staticmethod
+    def similarity(sig_a, sig_b):
+        return sum(x == y for x, y in zip(sig_a, sig_b)) / max(1, len(sig_a))
@@ -0,0 +1,53 @@
+"""
+Shared, pooled HTTP sessions (requests + keep-alive) for the API clients
+"""
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+HTTP_POOL_SIZE = int(os.environ.get("HTTP_POOL_SIZE", 32))
+HTTP_CONNECT_RETRIES = int(os.environ.get("HTTP_CONNECT_RETRIES", 3))
+
+
+def build_session(pool_size=HTTP_POOL_SIZE, connect_retries=HTTP_CONNECT_RETRIES,
+                  status_forcelist=(), backoff_factor=0.5):
+    """
+    A keep-alive `requests.Session` whose connection pool holds `pool_size`
+    sockets per host, so every worker thread reuses a warm TCP+TLS connection.
+
+    Connection failures are always retried. HTTP statuses are only retried when
+    listed in `status_forcelist` – callers that run their own 429 handling
+    (utils_llm's rate limiter) leave it empty so throttles reach them.
+    """
+    retry = Retry(
+        total=None,
+        connect=connect_retries,
+        read=0,
+        status=connect_retries if status_forcelist else 0,
+        status_forcelist=tuple(status_forcelist),
+        allowed_methods=None,           # POSTs too: our APIs are idempotent per request
+        backoff_factor=backoff_factor,
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session(name, **kwargs):
+    """Process-wide session per API `name`; `kwargs` go to `build_session` on first use."""
+    with _sessions_lock:
+        session = _sessions.get(name)
+        if session is None:
+            session = _sessions[name] = build_session(**kwargs)
+        return session
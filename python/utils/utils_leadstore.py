@@ -0,0 +1,184 @@
+"""
+Persistent lead store shared by buying_leads (discovery) and enriching_leads (scoring),
+plus the cache of executed search queries
+"""
+import os
+import json
+import time
+import sqlite3
+import threading
+from pathlib import Path
+
+from utils.utils_dedup import MinHasher, normalize_text
+
+LEAD_STORE_PATH = os.environ.get("LEAD_STORE_PATH", "data/leads.sqlite")
+DAY_SECS = 24 * 3600
+
+
+class LeadStore:
+    """
+    One row per Instagram handle (lower-cased, primary key) with first_seen /
+    last_seen from discovery runs and last_scraped / score from enrichment runs.
+
+    Thread-safe: the handle stream of `score_leads` is consumed from worker threads.
+    """
+
+    def __init__(self, path=LEAD_STORE_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS leads ("
+            " handle TEXT PRIMARY KEY,"
+            " followers INTEGER,"
+            " data TEXT,"
+            " first_seen REAL NOT NULL,"
+            " last_seen REAL NOT NULL,"
+            " last_scraped REAL,"
+            " score INTEGER,"
+            " stage TEXT)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS leads_last_scraped ON leads(last_scraped)")
+
+    def upsert_discovered(self, rows):
+        """Insert/refresh leads from a discovery run (dicts with 'channelName'); return how many were new."""
+        now = time.time()
+        new = 0
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                for row in rows:
+                    handle = normalize_handle(row.get("channelName"))
+                    if not handle:
+                        continue
+                    new += self._conn.execute("SELECT 1 FROM leads WHERE handle = ?", (handle,)).fetchone() is None
+                    self._conn.execute(
+                        "INSERT INTO leads (handle, followers, data, first_seen, last_seen) VALUES (?, ?, ?, ?, ?)"
+                        " ON CONFLICT(handle) DO UPDATE SET"
+                        "  followers = COALESCE(excluded.followers, followers),"
+                        "  data = excluded.data, last_seen = excluded.last_seen",
+                        (handle, _as_int(row.get("followersAmount")), json.dumps(row, default=str, ensure_ascii=False), now, now),
+                    )
+            except BaseException:
+                self._conn.execute("ROLLBACK")   # never leave the shared connection inside a transaction
+                raise
+            self._conn.execute("COMMIT")
+        return new
+
+    def needs_enrichment(self, handle, stale_after_days=30):
+        """True if `handle` was never scraped or its last scrape is older than `stale_after_days`."""
+        with self._lock:
+            row = self._conn.execute("SELECT last_scraped FROM leads WHERE handle = ?", (normalize_handle(handle),)).fetchone()
+        if row is None or row[0] is None:
+            return True
+        return stale_after_days is not None and time.time() - row[0] > stale_after_days * DAY_SECS
+
+    def mark_scraped(self, handle, score=None, stage=None):
+        """Record an enrichment result (or a handle Apify returned nothing for)."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO leads (handle, first_seen, last_seen, last_scraped, score, stage) VALUES (?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT(handle) DO UPDATE SET"
+                "  last_scraped = excluded.last_scraped, score = excluded.score, stage = excluded.stage",
+                (normalize_handle(handle), now, now, now, _as_int(score), stage),
+            )
+
+    def stats(self):
+        with self._lock:
+            total, scraped = self._conn.execute("SELECT COUNT(*), COUNT(last_scraped) FROM leads").fetchone()
+        return {"leads": total, "scraped": scraped}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def normalize_handle(handle):
+    """'@Some.User ' → 'some.user' – the key every LeadStore method uses."""
+    return str(handle or "").strip().lstrip("@").lower()
+
+
+def _as_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class QueryCache:
+    """
+    Executed Google-search terms with their MinHash signature and the leads they
+    yielded (same SQLite file as the LeadStore by default).
+
+    `partition` splits freshly generated terms into ones worth scraping and ones
+    that are exact/near duplicates of a term scraped within `max_age_days` (or of
+    an earlier term in the same batch); the latter are served from the cache.
+    """
+
+    def __init__(self, path=LEAD_STORE_PATH, *, threshold=0.8, num_perm=64):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.threshold = threshold
+        self.hasher = MinHasher(num_perm)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS queries ("
+            " normalized TEXT PRIMARY KEY,"
+            " term TEXT NOT NULL,"
+            " signature TEXT NOT NULL,"
+            " leads TEXT NOT NULL,"
+            " n_leads INTEGER NOT NULL,"
+            " scraped_at REAL NOT NULL)"
+        )
+
+    def recent(self, max_age_days=30):
+        """[(term, signature, leads)] scraped within `max_age_days`, newest first."""
+        cutoff = time.time() - max_age_days * DAY_SECS if max_age_days is not None else 0
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT term, signature, leads FROM queries WHERE scraped_at >= ? ORDER BY scraped_at DESC", (cutoff,)
+            ).fetchall()
+        return [(term, json.loads(sig), json.loads(leads)) for term, sig, leads in rows]
+
+    def partition(self, terms, max_age_days=30):
+        """Return (fresh terms, {duplicate term: (matched cached term, cached leads)})."""
+        known = {normalize_text(term): (term, sig, leads) for term, sig, leads in self.recent(max_age_days)}
+        fresh, cached, batch = [], {}, []
+        for term in terms:
+            norm = normalize_text(term)
+            if not norm:
+                continue
+            match = known.get(norm)
+            if match is None:
+                sig = self.hasher.signature(term)
+                match = next(
+                    (entry for entry in known.values() if MinHasher.similarity(sig, entry[1]) >= self.threshold),
+                    None,
+                )
+                if match is None and any(MinHasher.similarity(sig, other) >= self.threshold for other in batch):
+                    continue   # near-duplicate of a term already picked this run
+            if match is not None:
+                cached[term] = (match[0], match[2])
+                continue
+            fresh.append(term)
+            batch.append(sig)
+        return fresh, cached
+
+    def record(self, term, leads):
+        """Store the leads one scraped term produced (replaces an older entry)."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO queries (normalized, term, signature, leads, n_leads, scraped_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (normalize_text(term), term, json.dumps(self.hasher.signature(term)),
+                 json.dumps(leads, default=str, ensure_ascii=False), len(leads), time.time()),
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
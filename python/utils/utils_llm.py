@@ -2,44 +2,458 @@
 Utility functions for LLM API calls (OpenAI GPT and Perplexity)
 """
 import os
+import json
+import time
+import logging
+import asyncio
+import weakref
+from pathlib import Path
+import httpx
 import requests
 import openai
-from tenacity import retry, stop_after_attempt, wait_fixed, retry_if_exception_type
+from tenacity import retry, stop_after_attempt, wait_random_exponential, retry_if_exception
+
+from utils.utils_cache import cache_key, get_default_cache
+from utils.utils_ratelimit import RateLimiter, retry_after_secs
+from utils.utils_http import get_session
+from utils.utils_metrics import track_call, current_call, llm_labels, BATCH_PRICE_FACTOR
 
 OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
 PERPLEXITY_API_KEY = os.environ.get("PERPLEXITY_API_KEY", "")
 
+PERPLEXITY_URL = "https://api.perplexity.ai/chat/completions"
+
 openai.api_key = OPENAI_API_KEY
+openai.max_retries = 0          # retries go through our limiter so 429s reach the AIMD controller
+
+# Quota per provider; 0 = no client-side cap, rely on AIMD backing off on 429s.
+LLM_MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", 256))
+LLM_MAX_ATTEMPTS = int(os.environ.get("LLM_MAX_ATTEMPTS", 6))
+OPENAI_LIMITER = RateLimiter(
+    rpm=int(os.environ.get("OPENAI_RPM", 0)),
+    tpm=int(os.environ.get("OPENAI_TPM", 0)),
+    max_concurrency=LLM_MAX_CONCURRENCY,
+)
+PERPLEXITY_LIMITER = RateLimiter(
+    rpm=int(os.environ.get("PERPLEXITY_RPM", 0)),
+    tpm=int(os.environ.get("PERPLEXITY_TPM", 0)),
+    max_concurrency=LLM_MAX_CONCURRENCY,
+)
+
+
+def _estimate_tokens(messages):
+    # ~4 chars per token is close enough for budgeting; actual usage is refunded afterwards
+    return sum(len(str(m.get("content", ""))) for m in messages) // 4 + 4 * len(messages)
+
+
+def _status_code(exc):
+    code = getattr(exc, "status_code", None)
+    if code is None:
+        code = getattr(getattr(exc, "response", None), "status_code", None)
+    return code
+
 
-@retry(
-    stop=stop_after_attempt(2),
-    wait=wait_fixed(2),
-    retry=retry_if_exception_type(openai.OpenAIError),
+def _is_throttle(exc):
+    return isinstance(exc, openai.RateLimitError) or _status_code(exc) == 429
+
+
+def _is_retryable(exc):
+    if isinstance(exc, (openai.APIConnectionError, openai.APITimeoutError, httpx.TransportError,
+                        requests.ConnectionError, requests.Timeout)):
+        return True
+    code = _status_code(exc)
+    return code is not None and (code in (408, 409, 429) or code >= 500)
+
+
+_backoff = wait_random_exponential(multiplier=1, max=30)
+
+def _wait_retry_after(retry_state):
+    """Honour Retry-After when the server sends one, else jittered exponential backoff."""
+    ra = retry_after_secs(retry_state.outcome.exception())
+    return ra if ra is not None else _backoff(retry_state)
+
+
+_llm_retry = retry(
+    stop=stop_after_attempt(LLM_MAX_ATTEMPTS),
+    wait=_wait_retry_after,
+    retry=retry_if_exception(_is_retryable),
     reraise=True,
 )
-def gpt_chat(messages, model="gpt-4o", temperature=0.7, max_tokens=1024):
-    resp = openai.chat.completions.create(
-        model=model,
-        temperature=temperature,
-        messages=messages,
-        max_tokens=max_tokens,
-    )
+
+
+def _resolve_cache(cache):
+    """`cache` is opt-in per call: False/None → no cache, True → shared default, or an LLMCache."""
+    if cache is True:
+        return get_default_cache()
+    return cache or None
+
+
+def _count_attempt():
+    call = current_call()
+    if call is not None:
+        call.attempts += 1
+    return call
+
+
+@_llm_retry
+def _gpt_chat(messages, model, temperature, max_tokens, response_format=None):
+    call = _count_attempt()
+    with OPENAI_LIMITER.slot(_estimate_tokens(messages) + max_tokens) as slot:
+        try:
+            resp = openai.chat.completions.create(
+                model=model,
+                temperature=temperature,
+                messages=messages,
+                max_tokens=max_tokens,
+                **_response_format(response_format),
+            )
+        except Exception as exc:
+            if _is_throttle(exc):
+                OPENAI_LIMITER.throttled(retry_after_secs(exc))
+            raise
+        if resp.usage:
+            slot.used = resp.usage.total_tokens
+            if call is not None:
+                call.usage(resp.usage)
     return resp.choices[0].message.content
 
-def query_perplexity(prompt, timeout=40):
-    hdr = {
+
+def _response_format(response_format):
+    # only sent when set, so plain-text requests (and their cache keys) stay unchanged
+    return {"response_format": response_format} if response_format else {}
+
+
+def _chat_key(messages, model, temperature, max_tokens, response_format=None):
+    return cache_key(api="openai", model=model, temperature=temperature, max_tokens=max_tokens, messages=messages,
+                     **_response_format(response_format))
+
+
+def gpt_chat(messages, model="gpt-4o", temperature=0.7, max_tokens=1024, cache=False, response_format=None):
+    cache = _resolve_cache(cache)
+    if cache is None:
+        with track_call("openai", model):
+            return _gpt_chat(messages, model, temperature, max_tokens, response_format)
+
+    key = _chat_key(messages, model, temperature, max_tokens, response_format)
+    hit = cache.get(key)
+    if hit is not None:
+        with track_call("openai", model, cache_hit=True):
+            return hit
+    with track_call("openai", model):
+        content = _gpt_chat(messages, model, temperature, max_tokens, response_format)
+    if content:
+        cache.set(key, content)
+    return content
+
+
+def _perplexity_headers():
+    return {
         "Authorization": f"Bearer {PERPLEXITY_API_KEY}",
         "Content-Type": "application/json",
     }
-    resp = requests.post(
-        "https://api.perplexity.ai/chat/completions",
-        headers=hdr,
-        json={
-            "model": "sonar",
-            "messages": [{"role": "user", "content": prompt}],
-            "temperature": 0.3,
-        },
-        timeout=timeout,
+
+
+def _perplexity_payload(prompt):
+    return {
+        "model": "sonar",
+        "messages": [{"role": "user", "content": prompt}],
+        "temperature": 0.3,
+    }
+
+
+@_llm_retry
+def _query_perplexity(payload, timeout):
+    call = _count_attempt()
+    with PERPLEXITY_LIMITER.slot(_estimate_tokens(payload["messages"])) as slot:
+        resp = get_session("perplexity", pool_size=LLM_MAX_CONCURRENCY).post(
+            PERPLEXITY_URL,
+            headers=_perplexity_headers(),
+            json=payload,
+            timeout=timeout,
+        )
+        try:
+            resp.raise_for_status()
+        except requests.HTTPError as exc:
+            if _is_throttle(exc):
+                PERPLEXITY_LIMITER.throttled(retry_after_secs(exc))
+            raise
+        data = resp.json()
+        slot.used = data.get("usage", {}).get("total_tokens")
+        if call is not None:
+            call.usage(data.get("usage"))
+    return data["choices"][0]["message"]["content"]
+
+
+def query_perplexity(prompt, timeout=40, cache=False):
+    payload = _perplexity_payload(prompt)
+    cache = _resolve_cache(cache)
+    if cache is None:
+        with track_call("perplexity", payload["model"]):
+            return _query_perplexity(payload, timeout)
+
+    key = cache_key(api="perplexity", **payload)
+    hit = cache.get(key)
+    if hit is not None:
+        with track_call("perplexity", payload["model"], cache_hit=True):
+            return hit
+    with track_call("perplexity", payload["model"]):
+        content = _query_perplexity(payload, timeout)
+    if content:
+        cache.set(key, content)
+    return content
+
+
+###############################################################################
+#                              ASYNC VARIANTS                                 #
+###############################################################################
+# One AsyncOpenAI + pooled httpx client per event loop; they cannot be shared across loops.
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def _aclients():
+    loop = asyncio.get_running_loop()
+    clients = _async_clients.get(loop)
+    if clients is None:
+        limits = httpx.Limits(max_connections=LLM_MAX_CONCURRENCY, max_keepalive_connections=LLM_MAX_CONCURRENCY)
+        clients = (
+            openai.AsyncOpenAI(api_key=OPENAI_API_KEY, max_retries=0),
+            httpx.AsyncClient(limits=limits, headers=_perplexity_headers()),
+        )
+        _async_clients[loop] = clients
+    return clients
+
+
+async def aclose_clients():
+    """Close the clients bound to the running loop (call before the loop ends)."""
+    clients = _async_clients.pop(asyncio.get_running_loop(), None)
+    if clients:
+        await clients[0].close()
+        await clients[1].aclose()
+
+
+@_llm_retry
+async def _agpt_chat(messages, model, temperature, max_tokens, response_format=None):
+    call = _count_attempt()
+    client, _ = _aclients()
+    async with OPENAI_LIMITER.aslot(_estimate_tokens(messages) + max_tokens) as slot:
+        try:
+            resp = await client.chat.completions.create(
+                model=model,
+                temperature=temperature,
+                messages=messages,
+                max_tokens=max_tokens,
+                **_response_format(response_format),
+            )
+        except Exception as exc:
+            if _is_throttle(exc):
+                OPENAI_LIMITER.throttled(retry_after_secs(exc))
+            raise
+        if resp.usage:
+            slot.used = resp.usage.total_tokens
+            if call is not None:
+                call.usage(resp.usage)
+    return resp.choices[0].message.content
+
+
+async def agpt_chat(messages, model="gpt-4o", temperature=0.7, max_tokens=1024, cache=False, response_format=None):
+    cache = _resolve_cache(cache)
+    if cache is None:
+        with track_call("openai", model):
+            return await _agpt_chat(messages, model, temperature, max_tokens, response_format)
+
+    key = _chat_key(messages, model, temperature, max_tokens, response_format)
+    hit = cache.get(key)
+    if hit is not None:
+        with track_call("openai", model, cache_hit=True):
+            return hit
+    with track_call("openai", model):
+        content = await _agpt_chat(messages, model, temperature, max_tokens, response_format)
+    if content:
+        cache.set(key, content)
+    return content
+
+
+@_llm_retry
+async def _aquery_perplexity(payload, timeout):
+    call = _count_attempt()
+    _, http = _aclients()
+    async with PERPLEXITY_LIMITER.aslot(_estimate_tokens(payload["messages"])) as slot:
+        resp = await http.post(PERPLEXITY_URL, json=payload, timeout=timeout)
+        try:
+            resp.raise_for_status()
+        except httpx.HTTPStatusError as exc:
+            if _is_throttle(exc):
+                PERPLEXITY_LIMITER.throttled(retry_after_secs(exc))
+            raise
+        data = resp.json()
+        slot.used = data.get("usage", {}).get("total_tokens")
+        if call is not None:
+            call.usage(data.get("usage"))
+    return data["choices"][0]["message"]["content"]
+
+
+async def aquery_perplexity(prompt, timeout=40, cache=False):
+    payload = _perplexity_payload(prompt)
+    cache = _resolve_cache(cache)
+    if cache is None:
+        with track_call("perplexity", payload["model"]):
+            return await _aquery_perplexity(payload, timeout)
+
+    key = cache_key(api="perplexity", **payload)
+    hit = cache.get(key)
+    if hit is not None:
+        with track_call("perplexity", payload["model"], cache_hit=True):
+            return hit
+    with track_call("perplexity", payload["model"]):
+        content = await _aquery_perplexity(payload, timeout)
+    if content:
+        cache.set(key, content)
+    return content
+
+
+###############################################################################
+#                              OPENAI BATCH API                               #
+###############################################################################
+BATCH_MAX_REQUESTS = 50_000         # per-batch request limit of the Batch API
+BATCH_FINAL_STATES = {"completed", "failed", "expired", "cancelled"}
+
+
+def write_batch_requests(path, items, model="gpt-4o", temperature=0.7, max_tokens=1024):
+    """Write `(custom_id, messages)` pairs as a Batch API /v1/chat/completions JSONL file."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w", encoding="utf-8") as fh:
+        for custom_id, messages in items:
+            fh.write(json.dumps({
+                "custom_id": custom_id,
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {
+                    "model": model,
+                    "temperature": temperature,
+                    "max_tokens": max_tokens,
+                    "messages": messages,
+                },
+            }, ensure_ascii=False) + "\n")
+    return path
+
+
+def parse_batch_output(text, usage=None):
+    """
+    Batch output JSONL → {custom_id: content}; failed lines are left out.
+    Pass a dict as `usage` to also collect each answered line's token usage by custom_id.
+    """
+    out = {}
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        rec = json.loads(line)
+        resp = rec.get("response") or {}
+        if resp.get("status_code") != 200:
+            continue
+        try:
+            out[rec["custom_id"]] = resp["body"]["choices"][0]["message"]["content"]
+        except (KeyError, IndexError, TypeError):
+            continue
+        if usage is not None:
+            usage[rec["custom_id"]] = resp["body"].get("usage")
+    return out
+
+
+def openai_batch_run(path, poll_secs=60, completion_window="24h", on_submit=None, usage=None):
+    """
+    Upload a request JSONL, wait for the batch to finish and return {custom_id: content}.
+    `on_submit(batch_id)` is called as soon as the job exists, so callers can
+    persist the id and reattach with `openai_batch_wait` after a crash.
+    `usage` is filled as in `parse_batch_output`.
+    """
+    with open(path, "rb") as fh:
+        upload = openai.files.create(file=fh, purpose="batch")
+    job = openai.batches.create(
+        input_file_id=upload.id,
+        endpoint="/v1/chat/completions",
+        completion_window=completion_window,
     )
-    resp.raise_for_status()
-    return resp.json()["choices"][0]["message"]["content"]
+    if on_submit:
+        on_submit(job.id)
+    return openai_batch_wait(job.id, poll_secs, usage)
+
+
+def openai_batch_wait(batch_id, poll_secs=60, usage=None):
+    """Poll an already submitted batch until it is final and return {custom_id: content}."""
+    job = openai.batches.retrieve(batch_id)
+    while job.status not in BATCH_FINAL_STATES:
+        time.sleep(poll_secs)
+        job = openai.batches.retrieve(job.id)
+    if not job.output_file_id:
+        raise RuntimeError(f"OpenAI batch {job.id} ended as {job.status} without output")
+    # expired batches still deliver whatever finished; missing ids are the caller's to redo
+    return parse_batch_output(openai.files.content(job.output_file_id).text, usage)
+
+
+def batch_chat(items, workdir, model="gpt-4o", temperature=0.7, max_tokens=1024, cache=False, runner=None,
+               on_submit=None, reattach=()):
+    """
+    Answer many chat requests through the Batch API (half price, hours of latency).
+
+    items     – iterable of `(custom_id, messages)`
+    runner    – `callable(jsonl_path) -> {custom_id: content}`; defaults to
+                `openai_batch_run`, pass a local stub in tests
+    on_submit – `callable(batch_id)`, called for every batch the default runner submits
+    reattach  – ids of batches submitted by an interrupted run; their answers are
+                awaited and used first, only the items they lack are submitted again
+    A batch that ends without output (failed, cancelled, expired) is logged and
+    skipped: items of a reattached batch are submitted again, items of a new one
+    are missing from the result, for the caller to grade another way.
+    Cached answers are served without submitting; fresh ones are written back
+    under the same key `gpt_chat` uses, so interactive calls hit them too.
+    Every answer is recorded through `track_call` (api "openai_batch", labelled
+    profile=custom_id) with the usage of its output line, at BATCH_PRICE_FACTOR.
+    """
+    usage = {}
+    runner = runner or (lambda path: openai_batch_run(path, on_submit=on_submit, usage=usage))
+    cache = _resolve_cache(cache)
+    items = list(items)
+    earlier = {}
+    for batch_id in reattach:
+        try:
+            earlier.update(openai_batch_wait(batch_id, usage=usage))
+        except RuntimeError as exc:
+            logging.warning("Reattached batch %s gave no answers, resubmitting its items – %s", batch_id, exc)
+    results, pending = {}, []
+    for custom_id, messages in items:
+        if custom_id in earlier:
+            results[custom_id] = earlier[custom_id]
+            _track_batch_answer(custom_id, model, usage.get(custom_id))
+            continue
+        hit = cache.get(_chat_key(messages, model, temperature, max_tokens)) if cache else None
+        if hit is not None:
+            results[custom_id] = hit
+            _track_batch_answer(custom_id, model, None, cache_hit=True)
+        else:
+            pending.append((custom_id, messages))
+
+    stamp = time.strftime("%Y%m%d_%H%M%S")
+    for n, start in enumerate(range(0, len(pending), BATCH_MAX_REQUESTS)):
+        part = pending[start:start + BATCH_MAX_REQUESTS]
+        path = write_batch_requests(Path(workdir) / f"batch_{stamp}_{n}.jsonl", part, model, temperature, max_tokens)
+        try:
+            answers = runner(path)
+        except RuntimeError as exc:
+            logging.warning("Batch of %d request(s) (%s) gave no answers – %s", len(part), path.name, exc)
+            continue
+        for custom_id, messages in part:
+            content = answers.get(custom_id)
+            if content is None:
+                continue
+            results[custom_id] = content
+            _track_batch_answer(custom_id, model, usage.get(custom_id))
+            if cache:
+                cache.set(_chat_key(messages, model, temperature, max_tokens), content)
+    return results
+
+
+def _track_batch_answer(custom_id, model, usage, cache_hit=False):
+    with llm_labels(profile=custom_id), \
+            track_call("openai_batch", model, cache_hit=cache_hit, price_factor=BATCH_PRICE_FACTOR) as tracker:
+        tracker.usage(usage)
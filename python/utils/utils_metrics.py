@@ -0,0 +1,234 @@
+"""
+Token / latency / cost accounting for LLM calls, labelled by pipeline stage and profile
+"""
+import os
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+from pathlib import Path
+
+import pandas as pd
+
+# USD per 1M tokens (input, output); unknown models are counted at zero cost
+MODEL_PRICES = {
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4.1": (2.00, 8.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "sonar": (1.00, 1.00),
+}
+
+CACHED_INPUT_DISCOUNT = 0.5    # OpenAI bills prompt-cache hits at half the input price
+BATCH_PRICE_FACTOR = 0.5       # Batch API requests cost half of the synchronous price
+
+_labels = contextvars.ContextVar("llm_labels", default={})
+_sinks = contextvars.ContextVar("llm_metric_sinks", default=())
+
+
+def call_cost(model, prompt_tokens, completion_tokens, cached_tokens=0, price_factor=1.0):
+    price_in, price_out = MODEL_PRICES.get(model, (0.0, 0.0))
+    billed_in = prompt_tokens - cached_tokens * (1 - CACHED_INPUT_DISCOUNT)
+    return price_factor * (billed_in * price_in + completion_tokens * price_out) / 1_000_000
+
+
+@contextmanager
+def llm_labels(**labels):
+    """
+    Tag every LLM call made inside the block (and tasks/threads started from it), e.g. stage="grade".
+    `shares={profile: weight}` marks a call made for several profiles at once; `per_profile`
+    splits its tokens and cost across them in proportion to the weights.
+    """
+    token = _labels.set({**_labels.get(), **labels})
+    try:
+        yield
+    finally:
+        _labels.reset(token)
+
+
+class LLMMetrics:
+    """Thread-safe list of per-call records with run / stage / profile roll-ups."""
+
+    COLUMNS = ["api", "model", "stage", "profile", "prompt_tokens", "completion_tokens",
+               "cached_tokens", "latency_s", "retries", "cache_hit", "ok", "cost_usd", "shares"]
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.records = []
+
+    @contextmanager
+    def collect(self):
+        """Route every call made inside the block to this collector as well."""
+        token = _sinks.set(_sinks.get() + (self,))
+        try:
+            yield self
+        finally:
+            _sinks.reset(token)
+
+    def add(self, record):
+        with self._lock:
+            self.records.append(record)
+
+    def frame(self):
+        with self._lock:
+            return pd.DataFrame(self.records, columns=self.COLUMNS)
+
+    def summary(self, by=("stage", "model")):
+        """One row per stage/model: calls, tokens, share of prompt tokens served from the prompt cache, latency, retries, cost."""
+        df = self.frame()
+        if df.empty:
+            return pd.DataFrame()
+        df["stage"] = df["stage"].fillna("-")
+        out = df.groupby(list(by)).agg(
+            calls=("api", "size"),
+            cache_hits=("cache_hit", "sum"),
+            errors=("ok", lambda s: int((~s).sum())),
+            prompt_tokens=("prompt_tokens", "sum"),
+            completion_tokens=("completion_tokens", "sum"),
+            cached_tokens=("cached_tokens", "sum"),
+            retries=("retries", "sum"),
+            latency_mean_s=("latency_s", "mean"),
+            latency_p95_s=("latency_s", lambda s: s.quantile(0.95)),
+            cost_usd=("cost_usd", "sum"),
+        )
+        out.insert(out.columns.get_loc("cached_tokens") + 1, "cached_share",
+                   (out["cached_tokens"] / out["prompt_tokens"].where(out["prompt_tokens"] > 0)).fillna(0.0))
+        return out.reset_index()
+
+    def per_profile(self):
+        """
+        Tokens, calls and cost per profile (calls made under llm_labels(profile=...)).
+        A call labelled with `shares` counts once for each of its profiles and
+        its tokens and cost are split by the normalized weights.
+        """
+        df = self.frame()
+        df["share"] = 1.0
+        shared = df[df["shares"].notna()].copy()
+        if not shared.empty:
+            shared["shares"] = shared["shares"].map(_normalized)
+            shared["profile"] = shared["shares"].map(list)
+            shared["share"] = shared["shares"].map(lambda w: list(w.values()))
+            shared = shared.explode(["profile", "share"])
+            df = pd.concat([df[df["shares"].isna()], shared], ignore_index=True)
+        df = df.dropna(subset=["profile"])
+        if df.empty:
+            return pd.DataFrame(columns=["profile", "llm_calls", "prompt_tokens", "completion_tokens", "cost_usd"])
+        share = df["share"].astype(float)
+        for col in ("prompt_tokens", "completion_tokens", "cost_usd"):
+            df[col] = df[col] * share
+        out = df.groupby("profile").agg(
+            llm_calls=("api", "size"),
+            prompt_tokens=("prompt_tokens", "sum"),
+            completion_tokens=("completion_tokens", "sum"),
+            cost_usd=("cost_usd", "sum"),
+        )
+        out[["prompt_tokens", "completion_tokens"]] = out[["prompt_tokens", "completion_tokens"]].round().astype(int)
+        return out.reset_index()
+
+    def to_prometheus(self, prefix="llm"):
+        """Prometheus text exposition of the per stage/model/api counters."""
+        df = self.frame()
+        lines = []
+        if df.empty:
+            return ""
+        df["stage"] = df["stage"].fillna("")
+        grouped = df.groupby(["api", "model", "stage"])
+        series = [
+            ("calls_total", "counter", "LLM calls (including cache hits)", grouped.size()),
+            ("cache_hits_total", "counter", "Calls answered from the response cache", grouped["cache_hit"].sum()),
+            ("errors_total", "counter", "Calls that failed after all retries", grouped["ok"].apply(lambda s: (~s).sum())),
+            ("retries_total", "counter", "Retried attempts", grouped["retries"].sum()),
+            ("prompt_tokens_total", "counter", "Prompt tokens billed", grouped["prompt_tokens"].sum()),
+            ("completion_tokens_total", "counter", "Completion tokens billed", grouped["completion_tokens"].sum()),
+            ("cached_prompt_tokens_total", "counter", "Prompt tokens served from the provider prompt cache",
+             grouped["cached_tokens"].sum()),
+            ("latency_seconds_sum", "counter", "Total wall time of calls incl. retries", grouped["latency_s"].sum()),
+            ("cost_usd_total", "counter", "Estimated cost (MODEL_PRICES)", grouped["cost_usd"].sum()),
+        ]
+        for name, kind, help_text, values in series:
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+            for (api, model, stage), value in values.items():
+                lines.append(f'{prefix}_{name}{{api="{api}",model="{model}",stage="{stage}"}} {float(value):g}')
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path, prefix="llm"):
+        """Write the exposition atomically (node-exporter textfile collector friendly)."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        tmp.write_text(self.to_prometheus(prefix), encoding="utf-8")
+        os.replace(tmp, path)
+        return path
+
+
+def _normalized(weights):
+    total = sum(weights.values())
+    if total <= 0:
+        return {key: 1 / len(weights) for key in weights}
+    return {key: value / total for key, value in weights.items()}
+
+
+class CallTracker:
+    """Filled in by the attempt functions of one logical call (retries included)."""
+
+    def __init__(self):
+        self.attempts = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cached_tokens = 0
+
+    def usage(self, usage):
+        """Accumulate an OpenAI usage object or a Perplexity usage dict."""
+        if not usage:
+            return
+        get = usage.get if isinstance(usage, dict) else lambda k, d=None: getattr(usage, k, d)
+        self.prompt_tokens += get("prompt_tokens", 0) or 0
+        self.completion_tokens += get("completion_tokens", 0) or 0
+        details = get("prompt_tokens_details", None)
+        if details:
+            cached = details.get("cached_tokens") if isinstance(details, dict) else getattr(details, "cached_tokens", 0)
+            self.cached_tokens += cached or 0
+
+
+_current_call = contextvars.ContextVar("llm_call", default=None)
+
+
+def current_call():
+    return _current_call.get()
+
+
+@contextmanager
+def track_call(api, model, cache_hit=False, price_factor=1.0):
+    """
+    Time one logical LLM call and record it, with the active labels, in every collecting LLMMetrics.
+    `price_factor` scales the cost (BATCH_PRICE_FACTOR for Batch API answers).
+    """
+    tracker = CallTracker()
+    token = _current_call.set(tracker)
+    start = time.perf_counter()
+    ok = False
+    try:
+        yield tracker
+        ok = True
+    finally:
+        _current_call.reset(token)
+        labels = _labels.get()
+        record = {
+            "api": api,
+            "model": model,
+            "stage": labels.get("stage"),
+            "profile": labels.get("profile"),
+            "prompt_tokens": tracker.prompt_tokens,
+            "completion_tokens": tracker.completion_tokens,
+            "cached_tokens": tracker.cached_tokens,
+            "latency_s": time.perf_counter() - start,
+            "retries": max(0, tracker.attempts - 1),
+            "cache_hit": cache_hit,
+            "ok": ok,
+            "cost_usd": call_cost(model, tracker.prompt_tokens, tracker.completion_tokens,
+                                  tracker.cached_tokens, price_factor),
+            "shares": labels.get("shares"),
+        }
+        for sink in _sinks.get():
+            sink.add(record)
@@ -0,0 +1,149 @@
+"""
+Token counting and per-field budgets for the profile grading prompts
+"""
+import re
+import logging
+from collections import Counter
+from urllib.parse import urlsplit
+
+from utils.utils_dedup import normalize_text
+
+try:
+    import tiktoken
+except ImportError:          # optional: fall back to the ~4 chars/token estimate
+    tiktoken = None
+
+# tokens per prompt section; None as a whole (see enriching_leads) disables compaction
+TOKEN_BUDGETS = {
+    "biography": 150,
+    "external_urls": 60,
+    "captions": 450,
+    "hashtags": 40,
+    "ig_reasoning": 250,
+    "enrichment": 800,
+}
+
+CHARS_PER_TOKEN = 4
+PROMPT_CACHE_MIN_TOKENS = 1024   # OpenAI only caches prompt prefixes at least this long
+ELLIPSIS = " …"
+
+RE_URL = re.compile(r"(?:https?://|www\.)\S+", re.I)
+RE_HASHTAG = re.compile(r"#(\w+)")
+RE_MENTION_RUN = re.compile(r"(?:@[\w.]+\s*){4,}")     # long "@a @b @c @d" tag walls
+RE_EMOJI = re.compile(
+    "["
+    "\U0001F000-\U0001FAFF"   # pictographs, emoticons, transport, flags …
+    "\u2600-\u27BF"           # misc symbols, dingbats
+    "\u2B00-\u2BFF"           # arrows, stars
+    "\uFE0E\uFE0F\u200D\u20E3"  # variation selectors, joiner, keycap
+    "]+"
+)
+RE_REPEAT_PUNCT = re.compile(r"([!?.•·\-_=*~|])\1{2,}")
+RE_SPACES = re.compile(r"[ \t\u00a0]+")
+
+_encodings = {}
+_fallback_warned = False
+
+
+def _warn_fallback():
+    global _fallback_warned
+    if not _fallback_warned:
+        _fallback_warned = True
+        logging.warning("tiktoken is not installed – token budgets use a ~%d chars/token estimate", CHARS_PER_TOKEN)
+
+
+def _encoding(model):
+    if model not in _encodings:
+        try:
+            _encodings[model] = tiktoken.encoding_for_model(model)
+        except KeyError:
+            _encodings[model] = tiktoken.get_encoding("o200k_base")
+    return _encodings[model]
+
+
+def count_tokens(text, model="gpt-4o"):
+    """Tokens of `text` under the model's tokenizer (tiktoken), or a chars/4 estimate without it."""
+    if not text:
+        return 0
+    if tiktoken is None:
+        _warn_fallback()
+        return -(-len(text) // CHARS_PER_TOKEN)
+    return len(_encoding(model).encode(text, disallowed_special=()))
+
+
+def truncate_tokens(text, budget, model="gpt-4o"):
+    """Cut `text` to at most `budget` tokens (marker included), preferring a word boundary."""
+    if budget is None or count_tokens(text, model) <= budget:
+        return text
+    keep = max(0, budget - count_tokens(ELLIPSIS, model))
+    if tiktoken is None:
+        head = text[:keep * CHARS_PER_TOKEN]
+    else:
+        enc = _encoding(model)
+        head = enc.decode(enc.encode(text, disallowed_special=())[:keep])
+    cut = head.rsplit(None, 1)[0] if " " in head[len(head) // 2:] else head
+    return cut.rstrip() + ELLIPSIS if keep else ""
+
+
+def strip_noise(text):
+    """Drop URLs, emoji, tag walls and repeated punctuation; collapse whitespace per line."""
+    text = RE_URL.sub("", str(text or ""))
+    text = RE_EMOJI.sub(" ", text)
+    text = RE_MENTION_RUN.sub(" ", text)
+    text = RE_REPEAT_PUNCT.sub(r"\1", text)
+    lines = (RE_SPACES.sub(" ", line).strip() for line in text.splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def compact_external_urls(urls, budget=None, model="gpt-4o"):
+    """Apify `externalUrls` (dicts or strings) → "host/path" list without scheme, query or duplicates."""
+    if not urls:
+        return ""
+    if isinstance(urls, (str, dict)):
+        urls = [urls]
+    seen, out = set(), []
+    for entry in urls:
+        raw = (entry.get("url") or entry.get("lynx_url") or "") if isinstance(entry, dict) else str(entry)
+        parts = urlsplit(raw if "//" in raw else f"//{raw}")
+        short = (parts.netloc.lower().removeprefix("www.") + parts.path.rstrip("/")) or raw
+        if short and short not in seen:
+            seen.add(short)
+            out.append(short)
+    return truncate_tokens(", ".join(out), budget, model)
+
+
+def compact_captions(posts, budget=None, hashtag_budget=None, model="gpt-4o"):
+    """
+    Latest-post captions with noise stripped and exact/normalized duplicates
+    removed. Hashtags are pulled out of the captions and listed once, most
+    frequent first, on a leading "hashtags:" line (`hashtag_budget`). Captions are
+    then added whole, newest first, until `budget` tokens (hashtag line included)
+    are used; the last one is truncated.
+    """
+    tags = Counter()
+    captions, seen = [], set()
+    for post in posts or []:
+        caption = post.get("caption", "") if isinstance(post, dict) else str(post)
+        tags.update(tag.lower() for tag in RE_HASHTAG.findall(caption or ""))
+        text = strip_noise(RE_HASHTAG.sub("", caption or ""))
+        key = normalize_text(text)
+        if key and key not in seen:
+            seen.add(key)
+            captions.append(text.replace("\n", " / "))
+
+    lines = []
+    if tags:
+        hashtags = " ".join(f"#{tag}" for tag, _ in tags.most_common())
+        lines.append("hashtags: " + truncate_tokens(hashtags, hashtag_budget, model).removesuffix(ELLIPSIS))
+    used = sum(count_tokens(line, model) for line in lines)
+    for caption in captions:
+        left = None if budget is None else budget - used
+        if left is not None and left <= 0:
+            break
+        text = truncate_tokens(caption, left, model)
+        if not text:
+            break
+        line = f"- {text}"
+        lines.append(line)
+        used += count_tokens(line, model) + 1
+    return "\n".join(lines)
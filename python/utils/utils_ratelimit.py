@@ -0,0 +1,219 @@
+"""
+Client-side rate limiting for LLM APIs: token buckets (RPM / TPM) plus an
+AIMD concurrency controller that grows while calls succeed and halves on 429s.
+
+Every primitive works from worker threads (`acquire`, `slot`) and from
+coroutines (`aacquire`, `aslot`); both flavours share the same budget.
+"""
+import time
+import asyncio
+import threading
+from collections import deque
+from contextlib import contextmanager, asynccontextmanager
+from email.utils import parsedate_to_datetime
+
+
+class TokenBucket:
+    """Classic token bucket refilled at `per_minute / 60` per second; `per_minute <= 0` means unlimited."""
+
+    def __init__(self, per_minute, capacity=None):
+        self.rate = per_minute / 60.0 if per_minute and per_minute > 0 else 0.0
+        self.capacity = float(capacity or per_minute or 0)
+        self.tokens = self.capacity
+        self._blocked_until = 0.0
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self._stamp) * self.rate)
+        self._stamp = now
+
+    def _take(self, amount):
+        """Take `amount` if available and return 0, else return how long to wait."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if now >= self._blocked_until and self.tokens >= amount:
+                self.tokens -= amount
+                return 0.0
+            return min(5.0, max(self._blocked_until - now, (amount - self.tokens) / self.rate))
+
+    def acquire(self, amount=1.0):
+        if not self.rate:
+            return
+        amount = min(float(amount), self.capacity)
+        while (wait := self._take(amount)) > 0:
+            time.sleep(wait)
+
+    async def aacquire(self, amount=1.0):
+        if not self.rate:
+            return
+        amount = min(float(amount), self.capacity)
+        while (wait := self._take(amount)) > 0:
+            await asyncio.sleep(wait)
+
+    def refund(self, amount):
+        """Return over-reserved tokens (negative `amount` charges an under-estimate)."""
+        if not self.rate or not amount:
+            return
+        with self._lock:
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+    def pause(self, secs):
+        """Hold back every caller for `secs` (e.g. from a Retry-After header)."""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + secs)
+            self.tokens = 0.0
+
+
+class AdaptiveConcurrency:
+    """
+    AIMD limit on in-flight calls: +1 per `limit` successes (≈ +1 per round trip),
+    ×`backoff` on a throttle. Halving is applied at most once per `cooldown` seconds
+    so a burst of 429s from the same window only counts once.
+    """
+
+    def __init__(self, initial=10, *, min_limit=1, max_limit=64, backoff=0.5, cooldown=2.0):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.cooldown = cooldown
+        self.limit = float(min(max(initial, min_limit), max_limit))
+        self.in_flight = 0
+        self._last_cut = 0.0
+        self._cond = threading.Condition()
+        self._async_waiters = deque()       # (loop, future) of coroutines parked in aacquire
+
+    def acquire(self):
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self.in_flight += 1
+
+    async def aacquire(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._cond:
+                if self.in_flight < int(self.limit):
+                    self.in_flight += 1
+                    return
+                fut = loop.create_future()
+                self._async_waiters.append((loop, fut))
+            try:
+                # the timeout only matters if a wake-up was consumed by a cancelled waiter
+                await asyncio.wait_for(fut, timeout=1.0)
+            except asyncio.TimeoutError:
+                pass
+
+    def _wake(self):
+        # called with self._cond held
+        self._cond.notify_all()
+        free = int(self.limit) - self.in_flight
+        while free > 0 and self._async_waiters:
+            loop, fut = self._async_waiters.popleft()
+            if fut.done():
+                continue
+            loop.call_soon_threadsafe(_resolve, fut)
+            free -= 1
+
+    def release(self):
+        with self._cond:
+            self.in_flight -= 1
+            self._wake()
+
+    def on_success(self):
+        with self._cond:
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+            self._wake()
+
+    def on_throttle(self):
+        with self._cond:
+            now = time.monotonic()
+            if now - self._last_cut < self.cooldown:
+                return
+            self._last_cut = now
+            self.limit = max(self.min_limit, self.limit * self.backoff)
+
+
+def _resolve(fut):
+    if not fut.done():
+        fut.set_result(None)
+
+
+class _Slot:
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.used = None        # set to the real token count once the response is in
+
+
+class RateLimiter:
+    """One per provider; shared by every thread that talks to that provider."""
+
+    def __init__(self, *, rpm=0, tpm=0, initial_concurrency=10, max_concurrency=64):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.concurrency = AdaptiveConcurrency(initial_concurrency, max_limit=max_concurrency)
+        self.throttle_count = 0
+
+    @contextmanager
+    def slot(self, tokens=0):
+        """Wait for a request slot worth `tokens`; success feeds the AIMD controller."""
+        self.concurrency.acquire()
+        try:
+            self.requests.acquire(1)
+            self.tokens.acquire(tokens)
+            slot = _Slot(tokens)
+            yield slot
+            if slot.used is not None:
+                self.tokens.refund(tokens - slot.used)
+            self.concurrency.on_success()
+        finally:
+            self.concurrency.release()
+
+    @asynccontextmanager
+    async def aslot(self, tokens=0):
+        """Coroutine flavour of `slot`."""
+        await self.concurrency.aacquire()
+        try:
+            await self.requests.aacquire(1)
+            await self.tokens.aacquire(tokens)
+            slot = _Slot(tokens)
+            yield slot
+            if slot.used is not None:
+                self.tokens.refund(tokens - slot.used)
+            self.concurrency.on_success()
+        finally:
+            self.concurrency.release()
+
+    def throttled(self, retry_after=None):
+        """Report a 429: back off concurrency and pause the buckets for Retry-After seconds."""
+        self.throttle_count += 1
+        self.concurrency.on_throttle()
+        if retry_after:
+            self.requests.pause(retry_after)
+            self.tokens.pause(retry_after)
+
+
+def retry_after_secs(exc):
+    """Seconds from the Retry-After header of an HTTP error (openai or requests), else None."""
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000.0
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None